@@ -0,0 +1,185 @@
+"""
+Гистограммы оценок 1–10 по лекторам и практикам
+
+Для каждой пары (преподаватель, оценка) хранится гистограмма из десяти
+корзин и точная сумма. Новый ответ добавляется за O(1), а среднее, медиана,
+перцентили и байесовски сглаженное среднее считаются по гистограмме, без
+повторного прохода по ответам.
+"""
+
+import math
+
+SCORE_MIN = 1
+SCORE_MAX = 10
+
+# Вес априорного среднего: сколько «виртуальных» средних оценок добавляется
+# к каждому преподавателю при сглаживании
+BAYES_PRIOR_WEIGHT = 5
+
+
+def parse_score(raw):
+    """Возвращает оценку как float или None для «не ходил», пустых и мусорных ответов"""
+    try:
+        value = float(raw)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+class ScoreHistogram:
+    """Гистограмма оценок с корзинами 1..10 и точной суммой"""
+
+    __slots__ = ('counts', 'total')
+
+    def __init__(self):
+        self.counts = [0] * (SCORE_MAX - SCORE_MIN + 1)
+        self.total = 0.0
+
+    def add(self, value):
+        bucket = min(max(int(round(value)), SCORE_MIN), SCORE_MAX)
+        self.counts[bucket - SCORE_MIN] += 1
+        self.total += value
+
+    def merge(self, other):
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.total += other.total
+
+    @property
+    def count(self):
+        return sum(self.counts)
+
+    def mean(self):
+        count = self.count
+        return self.total / count if count else None
+
+    def percentile(self, p):
+        """Перцентиль по методу ближайшего ранга, с точностью до корзины"""
+        count = self.count
+        if not count:
+            return None
+        rank = max(1, math.ceil(p / 100 * count))
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                return SCORE_MIN + i
+        return SCORE_MAX
+
+    def smoothed_mean(self, prior_mean, prior_weight=BAYES_PRIOR_WEIGHT):
+        """Среднее, подтянутое к prior_mean тем сильнее, чем меньше оценок"""
+        count = self.count
+        if prior_mean is None:
+            return self.mean()
+        return (prior_weight * prior_mean + self.total) / (prior_weight + count)
+
+    def summary(self, prior_mean=None):
+        mean = self.mean()
+        smoothed = self.smoothed_mean(prior_mean)
+        return {
+            'count': self.count,
+            'mean': round(mean, 2) if mean is not None else None,
+            'median': self.percentile(50),
+            'p25': self.percentile(25),
+            'p75': self.percentile(75),
+            'smoothed': round(smoothed, 2) if smoothed is not None else None,
+            'histogram': list(self.counts),
+        }
+
+
+class ScoreIndex:
+    """Гистограммы по (вид преподавателя, имя, оценка) и общие по каждому виду
+
+    Вид — 'lecturer' или 'practitioner'. Сводки кэшируются и сбрасываются при
+    добавлении новой оценки.
+    """
+
+    def __init__(self):
+        self.entities = {}          # (kind, ключ преподавателя) -> {score_key: ScoreHistogram}
+        self.overall = {}           # (kind, score_key) -> ScoreHistogram
+        self._summaries = {}
+
+    def clear(self):
+        self.entities.clear()
+        self.overall.clear()
+        self._summaries.clear()
+
+    def add(self, kind, name, score_key, raw):
+        value = parse_score(raw)
+        scores = self.entities.setdefault((kind, name), {})
+        histogram = scores.get(score_key)
+        if histogram is None:
+            histogram = scores[score_key] = ScoreHistogram()
+        if value is None:
+            return
+        histogram.add(value)
+        overall = self.overall.get((kind, score_key))
+        if overall is None:
+            overall = self.overall[(kind, score_key)] = ScoreHistogram()
+        overall.add(value)
+        self._summaries.clear()
+
+    def merge(self, kind, name, score_key, histogram):
+        """Добавляет готовую гистограмму (например, из сводки закрытого семестра)"""
+        scores = self.entities.setdefault((kind, name), {})
+        target = scores.get(score_key)
+        if target is None:
+            target = scores[score_key] = ScoreHistogram()
+        if not histogram.count:
+            return
+        target.merge(histogram)
+        overall = self.overall.get((kind, score_key))
+        if overall is None:
+            overall = self.overall[(kind, score_key)] = ScoreHistogram()
+        overall.merge(histogram)
+        self._summaries.clear()
+
+    def export(self, label=str):
+        """Гистограммы строками [kind, имя, score_key, корзины, сумма] для JSON"""
+        return [
+            [kind, label(name), score_key, list(histogram.counts), histogram.total]
+            for (kind, name), scores in self.entities.items()
+            for score_key, histogram in scores.items()
+        ]
+
+    def merge_exported(self, rows, key=str):
+        """Обратная операция к export(); key превращает имя обратно в ключ"""
+        for kind, name, score_key, counts, total in rows:
+            histogram = ScoreHistogram()
+            histogram.counts = list(counts)
+            histogram.total = total
+            self.merge(kind, key(name), score_key, histogram)
+
+    def histogram(self, kind, name, score_key):
+        return self.entities.get((kind, name), {}).get(score_key) or ScoreHistogram()
+
+    def mean(self, kind, name, score_key, digits):
+        mean = self.histogram(kind, name, score_key).mean()
+        return round(mean, digits) if mean is not None else None
+
+    def names(self, kind):
+        return [name for entity_kind, name in self.entities if entity_kind == kind]
+
+    def summary(self, kind, name):
+        """Сводка по всем оценкам преподавателя: среднее, медиана, квартили, гистограмма"""
+        key = (kind, name)
+        if key not in self._summaries:
+            scores = self.entities.get(key, {})
+            result = {}
+            for score_key, histogram in scores.items():
+                prior = self.overall.get((kind, score_key))
+                result[score_key] = histogram.summary(prior.mean() if prior else None)
+            self._summaries[key] = result
+        return self._summaries[key]
+
+    def as_dict(self, label=str):
+        """Сводки по всем преподавателям, сгруппированные по виду
+
+        label превращает ключ преподавателя (например, ID) в имя для JSON.
+        """
+        if None not in self._summaries:
+            self._summaries[None] = {
+                kind + 's': {label(name): self.summary(kind, name) for name in self.names(kind)}
+                for kind in ('lecturer', 'practitioner')
+            }
+        return self._summaries[None]
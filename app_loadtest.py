@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный прогон main.app под WSGI-сервером на синтетическом наборе ответов
+
+Генерирует набор (benchmark.generate_dataset), запускает приложение
+отдельным процессом под gunicorn или werkzeug с заданным числом воркеров и
+потоков и гоняет смешанный трафик по /, /lecturers, /reviews и
+/lecturers/<имя> с фиксированным числом одновременных клиентов. Печатает
+запросы в секунду, p50/p90/p99 задержки по маршрутам и память сервера и
+сохраняет отчёт в JSON, чтобы сравнивать модели воркеров и кэширование:
+
+    python app_loadtest.py --responses 5000 --workers 4 --threads 1
+    python app_loadtest.py --workers 2 --threads 8 --preload --concurrency 32
+    python app_loadtest.py --server werkzeug --mix "/=1,/lecturers/<name>=3"
+    python app_loadtest.py --compare benchmarks/loadtest/a.json benchmarks/loadtest/b.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+import benchmark
+from webhook_loadtest import percentile
+
+RESULTS_DIR = 'benchmarks/loadtest'
+SERVERS = ('gunicorn', 'werkzeug')
+DEFAULT_MIX = '/=20,/lecturers=20,/reviews=5,/lecturers/<name>=55'
+STARTUP_TIMEOUT = 300
+
+
+def parse_mix(spec):
+    """'/=20,/reviews=5' -> {маршрут: вес}"""
+    mix = {}
+    for part in spec.split(','):
+        route, _, weight = part.strip().rpartition('=')
+        mix[route] = float(weight)
+    return mix
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_command(server, port, workers, threads, worker_class=None, preload=False, timeout=120):
+    """Команда запуска main:app; у werkzeug один процесс, потоки — по запросу"""
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', 'main:app',
+                   '--bind', f'127.0.0.1:{port}',
+                   '--workers', str(workers), '--threads', str(threads),
+                   '--timeout', str(timeout), '--log-level', 'warning']
+        if worker_class:
+            command += ['--worker-class', worker_class]
+        if preload:
+            command.append('--preload')
+        return command
+    return [sys.executable, '-m', 'flask', '--app', 'main', 'run',
+            '--host', '127.0.0.1', '--port', str(port),
+            '--with-threads' if threads > 1 else '--without-threads']
+
+
+def prepare_dataset(directory, responses, seed):
+    """Пишет синтетический набор и заранее разбивает его на шарды со сводками
+
+    Иначе при старте каждый воркер разбирал бы набор сам, и время старта
+    смешалось бы с замером.
+    """
+    data_path = os.path.join(directory, 'responses.json')
+    with open(data_path, 'w', encoding='utf-8') as f:
+        json.dump(benchmark.generate_dataset(responses, seed), f, ensure_ascii=False)
+    env = dict(os.environ, DATA_PATH=data_path, SHARDS_DIR=os.path.join(directory, 'shards'))
+    started = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import main'], env=env, check=True, stdout=subprocess.DEVNULL)
+    return env, time.perf_counter() - started
+
+
+def wait_ready(process, base_url, timeout=STARTUP_TIMEOUT):
+    """Ждёт, пока сервер ответит на /; возвращает время старта"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f'Сервер завершился с кодом {process.returncode}')
+        try:
+            if requests.get(f'{base_url}/', timeout=5).status_code == 200:
+                return time.perf_counter() - started
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f'Сервер не ответил за {timeout} с')
+
+
+def process_tree_rss(pid):
+    """Суммарный RSS процесса и его потомков в МБ (только Linux, иначе None)"""
+    def rss(p):
+        try:
+            with open(f'/proc/{p}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+        return 0.0
+
+    def children(p):
+        try:
+            with open(f'/proc/{p}/task/{p}/children') as f:
+                return [int(c) for c in f.read().split()]
+        except OSError:
+            return []
+
+    if not os.path.exists(f'/proc/{pid}'):
+        return None
+    total, stack = 0.0, [pid]
+    while stack:
+        p = stack.pop()
+        total += rss(p)
+        stack.extend(children(p))
+    return total
+
+
+def drive(base_url, mix, names, concurrency, duration, warmup, seed=0, timeout=120.0):
+    """Закрытый цикл: concurrency клиентов шлют запросы подряд в течение warmup + duration
+
+    Замеры за первые warmup секунд отбрасываются (прогрев кэшей и воркеров).
+    """
+    routes, weights = zip(*mix.items())
+    start = time.perf_counter()
+    measure_from, stop = start + warmup, start + warmup + duration
+
+    def client(i):
+        rng = random.Random(seed + i)
+        session = requests.Session()
+        samples = []
+        while True:
+            started = time.perf_counter()
+            if started >= stop:
+                return samples
+            route = rng.choices(routes, weights)[0]
+            path = route.replace('<name>', rng.choice(names)) if '<name>' in route else route
+            try:
+                response = session.get(base_url + path, timeout=timeout)
+                status, size = response.status_code, len(response.content)
+            except requests.RequestException as e:
+                status, size = type(e).__name__, 0
+            finished = time.perf_counter()
+            if started >= measure_from:
+                samples.append((route, finished - started, status, size, finished))
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = [sample for client_samples in pool.map(client, range(concurrency)) for sample in client_samples]
+    return measure_from, samples
+
+
+def summarize(samples, seconds):
+    latencies = sorted(latency for _, latency, _, _, _ in samples)
+    return {
+        'requests': len(samples),
+        'throughput': len(samples) / seconds if seconds else 0.0,
+        'errors': sum(1 for _, _, status, _, _ in samples if status != 200),
+        'latency_ms': {
+            'p50': percentile(latencies, 50) * 1000 if latencies else None,
+            'p90': percentile(latencies, 90) * 1000 if latencies else None,
+            'p99': percentile(latencies, 99) * 1000 if latencies else None,
+            'max': latencies[-1] * 1000 if latencies else None,
+        },
+        'bytes_mean': sum(size for _, _, _, size, _ in samples) / len(samples) if samples else 0,
+    }
+
+
+def report(measure_from, samples, config):
+    seconds = (max(finished for *_, finished in samples) - measure_from) if samples else 0.0
+    by_route = {}
+    for sample in samples:
+        by_route.setdefault(sample[0], []).append(sample)
+    return {
+        'commit': benchmark.git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'config': config,
+        'seconds': seconds,
+        'statuses': dict(Counter(str(status) for _, _, status, _, _ in samples)),
+        'total': summarize(samples, seconds),
+        'routes': {route: summarize(route_samples, seconds) for route, route_samples in sorted(by_route.items())},
+    }
+
+
+def print_report(result):
+    config, total = result['config'], result['total']
+    print(f'🚀 {config["server"]}: {config["workers"]} воркеров × {config["threads"]} потоков, '
+          f'{config["concurrency"]} клиентов, {config["responses"]} ответов')
+    print(f'   Старт сервера: {config["startup_seconds"]:.2f} с, подготовка шардов: {config["prepare_seconds"]:.2f} с'
+          + (f', память сервера: {config["server_rss_mb"]:.0f} МБ' if config.get('server_rss_mb') else ''))
+    print(f'📨 {total["requests"]} запросов за {result["seconds"]:.2f} с — {total["throughput"]:.1f} запросов/с, '
+          f'ошибок: {total["errors"]}')
+    print('   Статусы: ' + ', '.join(f'{status}: {count}' for status, count in sorted(result['statuses'].items())))
+    print(f'   {"маршрут":<20} {"зап/с":>8} {"p50":>9} {"p90":>9} {"p99":>9} {"max":>9} {"КБ":>9}')
+    for route, stats in list(result['routes'].items()) + [('всего', total)]:
+        latency = stats['latency_ms']
+        if latency['p50'] is None:
+            continue
+        print(f'   {route:<20} {stats["throughput"]:8.1f} {latency["p50"]:9.1f} {latency["p90"]:9.1f} '
+              f'{latency["p99"]:9.1f} {latency["max"]:9.1f} {stats["bytes_mean"] / 1024:9.1f}')
+
+
+def compare(base_path, new_path):
+    """Печатает пропускную способность и p99 двух отчётов по маршрутам"""
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    def label(result):
+        config = result['config']
+        return f'{result["commit"]} {config["server"]} w{config["workers"]}t{config["threads"]}'
+
+    print(f'{label(base)} -> {label(new)}')
+    rows = [('всего', base['total'], new['total'])]
+    rows += [(route, base['routes'].get(route), stats) for route, stats in new['routes'].items()]
+    for route, old, stats in rows:
+        if not old or old['latency_ms']['p99'] is None or stats['latency_ms']['p99'] is None:
+            continue
+        ratio = stats['throughput'] / old['throughput'] if old['throughput'] else float('inf')
+        marker = '⚠️' if ratio < 0.9 else '  '
+        print(f' {marker} {route:<20} {old["throughput"]:8.1f} -> {stats["throughput"]:8.1f} зап/с (x{ratio:.2f}), '
+              f'p99 {old["latency_ms"]["p99"]:8.1f} -> {stats["latency_ms"]["p99"]:8.1f} мс')
+
+
+def run(args):
+    mix = parse_mix(args.mix)
+    workdir = tempfile.mkdtemp(prefix='app-loadtest-')
+    process = None
+    try:
+        print(f'📦 Синтетический набор: {args.responses} ответов...')
+        env, prepare_seconds = prepare_dataset(workdir, args.responses, args.seed)
+
+        port = args.port or free_port()
+        base_url = f'http://127.0.0.1:{port}'
+        command = server_command(args.server, port, args.workers, args.threads,
+                                 args.worker_class, args.preload, int(args.timeout))
+        process = subprocess.Popen(command, env=env)
+        startup = wait_ready(process, base_url)
+
+        names = list(requests.get(f'{base_url}/stats.json', timeout=args.timeout).json()['lecturers'])
+        print(f'⏱  {args.warmup:g} с прогрева + {args.duration:g} с замера, {args.concurrency} клиентов')
+        measure_from, samples = drive(base_url, mix, names, args.concurrency, args.duration,
+                                      args.warmup, args.seed, args.timeout)
+        rss = process_tree_rss(process.pid)
+    finally:
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    config = {
+        'server': args.server,
+        'workers': args.workers if args.server == 'gunicorn' else 1,
+        'threads': args.threads,
+        'worker_class': args.worker_class,
+        'preload': args.preload,
+        'concurrency': args.concurrency,
+        'responses': args.responses,
+        'seed': args.seed,
+        'mix': mix,
+        'duration': args.duration,
+        'warmup': args.warmup,
+        'stream_templates': os.environ.get('STREAM_TEMPLATES', '1') != '0',
+        'prepare_seconds': prepare_seconds,
+        'startup_seconds': startup,
+        'server_rss_mb': rss,
+    }
+    return report(measure_from, samples, config)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--server', choices=SERVERS, default='gunicorn')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='процессов gunicorn')
+    parser.add_argument('--threads', type=int, default=1, help='потоков на процесс')
+    parser.add_argument('--worker-class', help='класс воркеров gunicorn (sync, gthread, ...)')
+    parser.add_argument('--preload', action='store_true',
+                        help='загрузить данные до fork воркеров (gunicorn --preload)')
+    parser.add_argument('--responses', type=int, default=5000, help='размер синтетического набора')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='маршруты с весами через запятую')
+    parser.add_argument('--concurrency', type=int, default=16, help='одновременных клиентов')
+    parser.add_argument('--duration', type=float, default=30.0, help='длительность замера, с')
+    parser.add_argument('--warmup', type=float, default=5.0, help='прогрев без замеров, с')
+    parser.add_argument('--timeout', type=float, default=120.0, help='таймаут одного запроса, с')
+    parser.add_argument('--port', type=int, help='порт сервера (по умолчанию свободный)')
+    parser.add_argument('--output', help='путь к JSON с результатами')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help='сравнить два сохранённых отчёта вместо запуска')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    logging.getLogger('urllib3').setLevel(logging.ERROR)
+    result = run(args)
+    print_report(result)
+
+    config = result['config']
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'{result["commit"]}-{config["server"]}-w{config["workers"]}t{config["threads"]}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f'📝 Результаты сохранены: {output}')
+
+
+if __name__ == '__main__':
+    main_cli(sys.argv[1:])
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Бенчмарки парсинга, агрегации, маршрутов Flask и генерации статического сайта
+
+Генерирует синтетические наборы ответов в формате load_raw() (список пар
+[вопрос, ответ]) и сохраняет результаты в JSON, чтобы сравнивать коммиты:
+
+    python benchmark.py --sizes 1000,10000,100000
+    python benchmark.py --sizes 1000000 --route-limit 0
+    python benchmark.py --compare benchmarks/results/old.json benchmarks/results/new.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import main
+import generate_static
+from main import (
+    app, SUBJECT_Q, LECTURER_Q, ID_Q, LECTURE_COMPLEXITY_Q, LECTURE_INTEREST_Q,
+    PRACTICE_COMPLEXITY_Q, PRACTICE_INTEREST_Q, LECTURER_FEEDBACK_Q,
+    PRACTICE_FEEDBACK_Q, PRACTITIONER_Q, DEFAULT_LECTURERS,
+)
+
+RESULTS_DIR = 'benchmarks/results'
+CREATED_Q = 'Время создания'
+
+# Доли «особых» ответов подобраны по реальному файлу с данными
+EMPTY_LECTURER_SHARE = 0.8     # лектор не указан -> берётся из DEFAULT_LECTURERS
+SKIPPED_SCORE_SHARE = 0.15     # «не ходил» вместо оценки
+PRACTITIONER_SLOTS = 5         # вопрос о практике повторяется пять раз
+EMPTY_PRACTITIONER_SHARE = 0.2
+
+WORDS = (
+    'лекции интересные сложные практик преподаватель тесты баллы доклад '
+    'семинар экзамен зачёт рассказывает спрашивает презентация история '
+    'России реформы культура наука техника советую не советую очень'
+).split()
+
+SURNAMES = ['Иванов', 'Петрова', 'Смирнов', 'Кузнецова', 'Попов', 'Соколова',
+            'Лебедев', 'Козлова', 'Новиков', 'Морозова', 'Павлов', 'Волкова']
+FIRST_NAMES = ['Андрей', 'Мария', 'Дмитрий', 'Анна', 'Никита', 'Дарья']
+PATRONYMICS = ['Сергеевич', 'Игоревна', 'Александрович', 'Павловна']
+
+
+def _person(rng):
+    return f'{rng.choice(SURNAMES)} {rng.choice(FIRST_NAMES)} {rng.choice(PATRONYMICS)}'
+
+
+def _score(rng):
+    if rng.random() < SKIPPED_SCORE_SHARE:
+        return rng.choice(['не ходил', 'не ходил '])
+    return str(rng.randint(1, 10))
+
+
+def _text(rng, max_words=80):
+    if rng.random() < 0.2:
+        return ''
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, max_words)))
+
+
+def generate_dataset(size, seed=0):
+    """Создаёт `size` синтетических ответов в формате сырого JSON"""
+    rng = random.Random(seed)
+    subjects = list(DEFAULT_LECTURERS)
+
+    # На каждый предмет — пара «своих» лекторов и небольшой пул практиков
+    extra_lecturers = {s: [_person(rng) for _ in range(2)] for s in subjects}
+    practitioners = {s: [_person(rng) for _ in range(4)] for s in subjects}
+
+    created = datetime(2025, 2, 1, 9, 0, 0)
+    raw = []
+    for i in range(size):
+        subject = rng.choice(subjects)
+        created += timedelta(seconds=rng.randint(30, 3600))
+
+        if rng.random() < EMPTY_LECTURER_SHARE:
+            lecturer = ''
+        else:
+            lecturer = rng.choice(extra_lecturers[subject])
+
+        entry = [
+            [ID_Q, str(2100000000 + i)],
+            [CREATED_Q, created.strftime('%Y-%m-%d %H:%M:%S')],
+            [SUBJECT_Q, subject],
+            [LECTURER_Q, lecturer],
+            [LECTURE_COMPLEXITY_Q, _score(rng)],
+            [LECTURE_INTEREST_Q, _score(rng)],
+            [LECTURER_FEEDBACK_Q, _text(rng)],
+        ]
+
+        # Один из пяти повторяющихся вопросов о практике заполнен, остальные пустые
+        filled = rng.randrange(PRACTITIONER_SLOTS)
+        named = rng.random() >= EMPTY_PRACTITIONER_SHARE
+        for slot in range(PRACTITIONER_SLOTS):
+            name = rng.choice(practitioners[subject]) if slot == filled and named else ''
+            entry.append([PRACTITIONER_Q, name])
+
+        entry += [
+            [PRACTICE_COMPLEXITY_Q, _score(rng)],
+            [PRACTICE_INTEREST_Q, _score(rng)],
+            [PRACTICE_FEEDBACK_Q, _text(rng)],
+        ]
+        raw.append(entry)
+    return raw
+
+
+def measure(fn, repeat=3):
+    """Запускает fn несколько раз и возвращает время в секундах"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return {
+        'min': min(timings),
+        'median': statistics.median(timings),
+        'repeat': repeat,
+    }, result
+
+
+def _route_urls():
+    """Пары (маршрут, URL) для всех страниц приложения"""
+    urls = [(route, route) for route in ('/', '/lecturers', '/practitioners', '/subjects', '/reviews', '/stats.json')]
+    for section, names in (('lecturers', main.LECTURERS), ('practitioners', main.PRACTITIONERS),
+                           ('subjects', main.subject_names())):
+        first = next(iter(names), None)
+        if first is not None:
+            urls.append((f'/{section}/<name>', f'/{section}/{first}'))
+    return urls
+
+
+def bench_size(size, seed, repeat, route_limit):
+    raw = generate_dataset(size, seed)
+    results = {}
+
+    timing, _ = measure(lambda: main.parse_responses(raw), repeat)
+    timing['records_per_sec'] = size / timing['min'] if timing['min'] else None
+    results['parse_responses'] = timing
+
+    main.load_dataset(raw)
+
+    timing, groups = measure(lambda: main.group_by('lecturer'), repeat)
+    timing['groups'] = len(groups)
+    results['group_by'] = timing
+
+    if size > route_limit:
+        results['skipped'] = f'маршруты и статика пропущены: {size} > --route-limit {route_limit}'
+        return results
+
+    client = app.test_client()
+    reviews_html = ''
+    for route, url in _route_urls():
+        name = 'route ' + route
+
+        def get():
+            response = client.get(url)
+            return response.status_code, response.get_data()
+
+        timing, (status, body) = measure(get, repeat)
+        timing['status'] = status
+        timing['bytes'] = len(body)
+        results[name] = timing
+        if url == '/reviews':
+            reviews_html = body.decode('utf-8')
+
+    timing, _ = measure(lambda: generate_static.fix_github_pages_links(reviews_html, 'reviews'), repeat)
+    timing['bytes'] = len(reviews_html)
+    results['fix_github_pages_links'] = timing
+
+    # Статика собирается во временной папке, чтобы не трогать docs/ репозитория
+    root = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        if os.path.exists('static'):
+            shutil.copytree('static', os.path.join(tmp, 'static'))
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                timing, _ = measure(generate_static.generate_static_site, 1)
+        finally:
+            os.chdir(root)
+    results['generate_static_site'] = timing
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(sizes, seed, repeat, route_limit):
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': {},
+    }
+    try:
+        for size in sizes:
+            print(f'⏱  {size} ответов...')
+            report['results'][str(size)] = bench_size(size, seed, repeat, route_limit)
+            for step, timing in report['results'][str(size)].items():
+                if isinstance(timing, dict):
+                    print(f'   {step:<28} {timing["min"] * 1000:10.2f} мс')
+    finally:
+        # Возвращаем настоящие данные на место
+        main.load_data()
+    return report
+
+
+def compare(base_path, new_path):
+    """Печатает отношение времени new/base для каждого шага"""
+    with open(base_path, encoding='utf-8') as f:
+        base = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f'{base["commit"]} -> {new["commit"]}')
+    for size, steps in new['results'].items():
+        print(f'{size} ответов:')
+        for step, timing in steps.items():
+            old = base['results'].get(size, {}).get(step)
+            if not isinstance(timing, dict) or not isinstance(old, dict):
+                continue
+            ratio = timing['min'] / old['min'] if old['min'] else float('inf')
+            marker = '⚠️' if ratio > 1.1 else '  '
+            print(f' {marker} {step:<28} {old["min"] * 1000:10.2f} -> {timing["min"] * 1000:10.2f} мс  (x{ratio:.2f})')
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000',
+                        help='размеры наборов через запятую (до 1000000)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--route-limit', type=int, default=100000,
+                        help='не рендерить страницы для наборов больше этого размера')
+    parser.add_argument('--output', help='путь к JSON с результатами')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'),
+                        help='сравнить два сохранённых JSON вместо запуска')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    sizes = [int(s) for s in args.sizes.split(',') if s]
+    report = run(sizes, args.seed, args.repeat, args.route_limit)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{report["commit"]}.json')
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f'📝 Результаты сохранены: {output}')
+
+
+if __name__ == '__main__':
+    main_cli(sys.argv[1:])
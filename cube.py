@@ -0,0 +1,98 @@
+"""
+Куб (предмет, лектор, практик) -> число отзывов и суммы оценок
+
+Ячейки заполняются за один проход при загрузке и дополняются по одному
+ответу. Срезы по любому набору измерений (например, предмет × лектор)
+считаются за O(ячеек) и кэшируются до следующего добавления, поэтому
+фильтры и страницы предметов не зависят от числа отзывов.
+
+Ячейка — список [count, sum_1, cnt_1, sum_2, cnt_2, ...] по MEASURES.
+
+Отзыв с лекторами-соавторами попадает в ячейку каждого из них, поэтому
+свёртка по предмету считала бы его несколько раз. Итоги по предметам
+хранятся отдельно (subjects), по одному учёту на отзыв.
+"""
+
+DIMENSIONS = ('subject', 'lecturer', 'practitioner')
+MEASURES = ('lecture_complexity', 'lecture_interest', 'practice_complexity', 'practice_interest')
+
+_CELL_SIZE = 1 + 2 * len(MEASURES)
+
+
+def cell_count(cell):
+    return cell[0]
+
+
+def cell_mean(cell, measure, digits):
+    """Среднее оценки в ячейке или None, если оценок нет"""
+    i = 1 + 2 * MEASURES.index(measure)
+    return round(cell[i] / cell[i + 1], digits) if cell[i + 1] else None
+
+
+class FeedbackCube:
+    """Материализованный куб отзывов по ID предмета, лектора и практика"""
+
+    def __init__(self):
+        self.cells = {}
+        self.subjects = {}              # ID предмета -> ячейка по отзывам, а не по парам
+        self._rollups = {}
+
+    def clear(self):
+        self.cells.clear()
+        self.subjects.clear()
+        self._rollups.clear()
+
+    def add(self, subject, teachers, scores):
+        """Добавляет один отзыв; teachers — пары (лектор, практик), scores — оценки по MEASURES (None, если нет)"""
+        for lecturer, practitioner in teachers:
+            _add_scores(self.cells, (subject, lecturer, practitioner), scores)
+        _add_scores(self.subjects, subject, scores)
+        self._rollups.clear()
+
+    def add_cell(self, subject, lecturer, practitioner, cell):
+        """Добавляет готовую ячейку (например, из сводки закрытого семестра)"""
+        _add_cell(self.cells, (subject, lecturer, practitioner), cell)
+        self._rollups.clear()
+
+    def add_subject_cell(self, subject, cell):
+        """Добавляет готовый итог предмета (например, из сводки закрытого семестра)"""
+        _add_cell(self.subjects, subject, cell)
+
+    def rollup(self, *dims):
+        """Свёртка по измерениям dims: {(значения dims): ячейка}
+
+        Порядок ключей — порядок первого появления в кубе.
+        """
+        if dims not in self._rollups:
+            positions = tuple(DIMENSIONS.index(d) for d in dims)
+            result = {}
+            for key, cell in self.cells.items():
+                sub_key = tuple(key[p] for p in positions)
+                total = result.get(sub_key)
+                if total is None:
+                    result[sub_key] = list(cell)
+                else:
+                    for i, value in enumerate(cell):
+                        total[i] += value
+            self._rollups[dims] = result
+        return self._rollups[dims]
+
+
+def _add_scores(cells, key, scores):
+    cell = cells.get(key)
+    if cell is None:
+        cell = cells[key] = [0] * _CELL_SIZE
+    cell[0] += 1
+    for i, value in enumerate(scores):
+        if value is not None:
+            cell[1 + 2 * i] += value
+            cell[2 + 2 * i] += 1
+
+
+def _add_cell(cells, key, cell):
+    total = cells.get(key)
+    if total is None:
+        cells[key] = list(cell)
+    else:
+        for i, value in enumerate(cell):
+            total[i] += value
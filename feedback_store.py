@@ -0,0 +1,264 @@
+"""
+Сжатое хранилище длинных текстов отзывов
+
+Тексты о лекциях и практиках — самая тяжёлая часть разобранного ответа, а
+нужны они только страницам, которые их показывают. Длинный текст
+дописывается в открытый блок своей группы (например, предмет и лектор), а в
+ответе вместо текста остаётся FeedbackRef (блок, номер текста). Группы нужны,
+чтобы странице лектора или предмета приходилось распаковывать только свои
+блоки, а не весь архив. Распакованные блоки держатся в общем небольшом LRU,
+так что память процесса определяется числовыми индексами, а не сочинениями
+студентов.
+
+Разбор ответов хранилище не трогает: это в разы замедлило бы запуск. Тексты
+переносятся в него из уже разобранных ответов — compress() или в фоновом
+потоке compress_later(), а до того ответы держат строки как есть. Тексты
+закрытых семестров сжимаются один раз, при подсчёте сводки, и дальше
+читаются с диска через FeedbackArchive.
+"""
+
+import os
+import threading
+import weakref
+import zlib
+from array import array
+from collections import OrderedDict, defaultdict
+
+# Блоки небольшие: страницы читают отзывы вразнобой (по предметам, по
+# лекторам), и распаковка одного блока должна стоить десятки микросекунд.
+# Размер блока считается в символах, чтобы не кодировать тексты при разборе:
+# 8 тысяч символов кириллицы — около 16 КБ
+BLOCK_SIZE = 8 * 1024
+COMPRESSION_LEVEL = 6
+# Короткие ответы ('—', «всё понравилось») хранятся как есть: ссылка заняла бы не меньше
+INLINE_LIMIT = 64
+_FIELD_BITS = 24
+_FIELD_MASK = (1 << _FIELD_BITS) - 1
+
+# Хранилища, в которые ещё переносятся тексты в фоне (см. _restart_sealers)
+_sealing = weakref.WeakSet()
+
+
+class BlockCache:
+    """LRU распакованных блоков, общий для всех хранилищ"""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._blocks.clear()
+
+    def get(self, store, index):
+        key = (store, index)
+        with self._lock:
+            block = self._blocks.get(key)
+            if block is not None:
+                self._blocks.move_to_end(key)
+                return block
+        block = zlib.decompress(store.compressed(index))
+        with self._lock:
+            self._blocks[key] = block
+            while len(self._blocks) > self.capacity:
+                self._blocks.popitem(last=False)
+        return block
+
+
+class FeedbackRef:
+    """Ссылка на текст в хранилище; position — упакованное положение текста в нём"""
+
+    __slots__ = ('store', 'position')
+
+    def __init__(self, store, position):
+        self.store = store
+        self.position = position
+
+    def text(self):
+        return self.store.get(self.position)
+
+
+class FeedbackStore:
+    """Тексты блоками; put() возвращает строку (короткую) или FeedbackRef (блок, номер текста)"""
+
+    def __init__(self, cache, block_size=BLOCK_SIZE):
+        self.cache = cache
+        self.block_size = block_size
+        self.blocks = []                # сжатые блоки; None — блок ещё не сжат
+        self.offsets = []               # блок -> смещения текстов в распакованном блоке
+        self._texts = {}                # номер несжатого блока -> его тексты
+        self._open = {}                 # группа -> (номер блока, символов в нём)
+        self._lock = threading.Lock()
+        self._seal_lock = threading.Lock()
+        self._job = None                # аргументы compress_later(), пока перенос не закончен
+
+    def put(self, text, group=None):
+        return self.put_many([text], group)[0]
+
+    def put_many(self, texts, group=None):
+        """put() для нескольких текстов одной группы под одной блокировкой"""
+        refs = []
+        append = refs.append
+        block_size = self.block_size
+        with self._lock:
+            index, size = self._open.get(group) or (None, 0)
+            for text in texts:
+                if len(text) < INLINE_LIMIT:
+                    append(text)
+                    continue
+                if index is None:
+                    index, size = len(self.blocks), 0
+                    self.blocks.append(None)
+                    self.offsets.append(None)
+                    self._texts[index] = block = []
+                else:
+                    block = self._texts[index]
+                append(FeedbackRef(self, (index << _FIELD_BITS) | len(block)))
+                block.append(text)
+                size += len(text)
+                if size >= block_size:
+                    # Заполненный блок закрывается, но сжимается только в seal()
+                    index = None
+            if index is None:
+                self._open.pop(group, None)
+            else:
+                self._open[group] = (index, size)
+        return refs
+
+    def seal(self):
+        """Сжимает все несжатые блоки, например после загрузки всех ответов"""
+        with self._seal_lock:
+            while self._seal_next():
+                pass
+
+    def compress(self, records, questions, group_of):
+        """Переносит длинные тексты ответов по вопросам questions в хранилище
+
+        Блоки группируются по group_of(ответ) и сжимаются, и только потом
+        поле ответа заменяется на FeedbackRef, так что читающие параллельно
+        видят либо строку, либо ссылку на сжатый текст.
+        """
+        grouped = defaultdict(list)
+        for record in records:
+            for question in questions:
+                text = record.get(question)
+                if isinstance(text, str) and len(text) >= INLINE_LIMIT:
+                    grouped[group_of(record)].append((record, question))
+        fields = []
+        for group, texts in grouped.items():
+            refs = self.put_many([record[question] for record, question in texts], group)
+            fields += zip(texts, refs)
+        self.seal()
+        for (record, question), ref in fields:
+            record[question] = ref
+        self._job = None
+        _sealing.discard(self)
+
+    def compress_later(self, records, questions, group_of):
+        """compress() в фоновом потоке, не задерживая запуск"""
+        self._job = (list(records), questions, group_of)
+        _sealing.add(self)
+        threading.Thread(target=self.compress, args=self._job, name='feedback-sealer', daemon=True).start()
+
+    def _seal_next(self):
+        with self._lock:
+            if not self._texts:
+                return False
+            index, texts = next(iter(self._texts.items()))
+            # Больше в блок ничего не допишется: следующие тексты группы пойдут в новый
+            for group, (open_index, _) in list(self._open.items()):
+                if open_index == index:
+                    del self._open[group]
+        # Сжатие идёт вне блокировки: get() тем временем отдаёт тексты из памяти
+        data = [text.encode('utf-8') for text in texts]
+        offsets = array('I', [0])
+        for chunk in data:
+            offsets.append(offsets[-1] + len(chunk))
+        block = zlib.compress(b''.join(data), COMPRESSION_LEVEL)
+        with self._lock:
+            self.blocks[index] = block
+            self.offsets[index] = offsets
+            del self._texts[index]
+        return True
+
+    def compressed(self, index):
+        return self.blocks[index]
+
+    def span(self, position):
+        """(блок, смещение, длина) текста в распакованном блоке; только для сжатых блоков"""
+        index, item = position >> _FIELD_BITS, position & _FIELD_MASK
+        offsets = self.offsets[index]
+        return index, offsets[item], offsets[item + 1] - offsets[item]
+
+    def get(self, position):
+        index, item = position >> _FIELD_BITS, position & _FIELD_MASK
+        with self._lock:
+            texts = self._texts.get(index)
+            if texts is not None:
+                return texts[item]
+        _, start, length = self.span(position)
+        return self.cache.get(self, index)[start:start + length].decode('utf-8')
+
+    def stats(self):
+        """Размер хранилища: число блоков, байты в сжатом виде и символы ещё не сжатых текстов"""
+        with self._lock:
+            return {
+                'blocks': len(self.blocks),
+                'compressed_bytes': sum(len(block) for block in self.blocks if block is not None),
+                'pending_chars': sum(len(text) for texts in self._texts.values() for text in texts),
+            }
+
+
+class FeedbackArchive:
+    """Сжатые блоки текстов закрытого семестра, которые читаются с диска по смещениям
+
+    blocks — (смещение, длина) сжатых блоков, read(смещение, длина) читает
+    сжатый блок. position упаковывает (блок, смещение, длина) текста в
+    распакованном блоке, см. archive_position().
+    """
+
+    def __init__(self, cache, blocks, read):
+        self.cache = cache
+        self.blocks = blocks
+        self._read = read
+
+    def compressed(self, index):
+        offset, length = self.blocks[index]
+        return self._read(offset, length)
+
+    def get(self, position):
+        index = position >> 2 * _FIELD_BITS
+        start = (position >> _FIELD_BITS) & _FIELD_MASK
+        end = start + (position & _FIELD_MASK)
+        return self.cache.get(self, index)[start:end].decode('utf-8')
+
+
+def archive_position(store, value):
+    """Положение текста из сжатого FeedbackStore для FeedbackArchive; -1 — текст хранится как есть"""
+    if not isinstance(value, FeedbackRef):
+        return -1
+    index, start, length = store.span(value.position)
+    if start > _FIELD_MASK or length > _FIELD_MASK:
+        return -1
+    return (index << 2 * _FIELD_BITS) | (start << _FIELD_BITS) | length
+
+
+def feedback_text(value):
+    """Текст отзыва из поля ответа: строка как есть, FeedbackRef — из хранилища"""
+    return value.text() if isinstance(value, FeedbackRef) else value
+
+
+def _restart_sealers():
+    # gunicorn --preload форкает воркеры, пока фоновый перенос ещё идёт: в дочернем
+    # процессе потока нет, а блокировки могли остаться захваченными. Уже
+    # перенесённые поля держат ссылки и повторно не переносятся
+    for store in list(_sealing):
+        store._lock = threading.Lock()
+        store._seal_lock = threading.Lock()
+        if store._job is not None:
+            store.compress_later(*store._job)
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_sealers)
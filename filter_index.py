@@ -0,0 +1,41 @@
+"""
+Битовый индекс для фильтрации отзывов на клиенте
+
+Для каждого лектора, практика и предмета строится битовая маска над
+отзывами в порядке их вывода на странице. Маски кодируются в base64 как
+little-endian Uint32Array, и скрипт на странице считает видимые отзывы
+операциями AND/OR над словами, не обходя DOM.
+"""
+
+import base64
+
+
+def _encode(bits):
+    return base64.b64encode(bytes(bits)).decode('ascii')
+
+
+def build_filter_index(reviews):
+    """reviews — список (лекторы, практики, предметы) в порядке карточек на странице
+
+    У карточки может быть несколько лекторов (соавторы) и практиков: её бит
+    ставится в маску каждого.
+    """
+    count = len(reviews)
+    words = (count + 31) // 32
+    size = words * 4
+
+    masks = {'lecturers': {}, 'practitioners': {}, 'subjects': {}}
+    for i, keys in enumerate(reviews):
+        byte, bit = i >> 3, 1 << (i & 7)
+        for kind, names in zip(masks, keys):
+            for key in names:
+                mask = masks[kind].get(key)
+                if mask is None:
+                    mask = masks[kind][key] = bytearray(size)
+                mask[byte] |= bit
+
+    index = {'count': count, 'words': words}
+    for kind, by_key in masks.items():
+        index[kind] = list(by_key)
+        index[kind[:-1] + '_bits'] = [_encode(mask) for mask in by_key.values()]
+    return index
@@ -1,50 +1,176 @@
-from flask_frozen import Freezer
-from main import app, LECTURERS
+"""
+Статическая сборка сайта в docs/ по явному манифесту страниц
+
+Вместо обхода ссылок (Frozen-Flask) список страниц берётся из индекса данных:
+главная, списки разделов, stats.json и страница каждого лектора, практика и
+предмета. Страницы рендерятся параллельно в нескольких процессах, ссылки
+переписываются так же, как в generate_static.py, а на диск попадают только
+изменившиеся файлы — время сборки линейно по числу страниц. Заодно пишется
+конфигурация заголовков кэширования для nginx (nginx/cache-headers.conf).
+"""
+
+import json
+import multiprocessing
 import os
-import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from fnmatch import fnmatch
 from urllib.parse import quote
 
-# Настройка Freezer
-app.config['FREEZER_DESTINATION'] = 'docs'  # GitHub Pages читает из папки docs
-app.config['FREEZER_RELATIVE_URLS'] = True
-app.config['FREEZER_DESTINATION_IGNORE'] = ['.git*']
-app.config['FREEZER_DEFAULT_MIMETYPE'] = 'text/html'
-freezer = Freezer(app)
+import generate_static
+import main
+from generate_static import (FINGERPRINT_EXTENSIONS, SECTIONS, fingerprinted_name,
+                             fix_github_pages_links, safe_filename, url_mapping_js)
+from main import app, LECTURERS, PRACTITIONERS, subject_names
+
+DESTINATION = 'docs'  # GitHub Pages читает из папки docs
+DESTINATION_IGNORE = ['.git*']
+FREEZE_WORKERS = int(os.environ.get('FREEZE_WORKERS', os.cpu_count() or 1))
+# Страниц на одну задачу процесса: меньше — ровнее загрузка, больше — меньше накладных расходов
+PAGES_PER_TASK = 8
+
+
+def page_manifest():
+    """Все страницы сайта: (URL, путь в docs/, положение страницы для ссылок или None без правки)"""
+    pages = [('/', 'index.html', '')]
+    pages += [(f'/{section}', f'{section}/index.html', section) for section in SECTIONS]
+    pages.append(('/stats.json', 'stats.json', None))
+    for section, names in (('lecturers', LECTURERS.keys()),
+                           ('practitioners', PRACTITIONERS.keys()),
+                           ('subjects', subject_names())):
+        for name in names:
+            safe_name = safe_filename(name)
+            # Имя — свободный текст: '?', '#' и '%' в URL кодируются, '/' разбирает маршрут path:name
+            pages.append((f'/{section}/{quote(name)}', f'{section}/{safe_name}/index.html', f'{section}/{safe_name}'))
+    return pages
+
+
+def asset_files():
+    """static/ и url-mapping.js с отпечатками в именах плюс asset-manifest.json: путь в docs/ -> байты"""
+    sources = {}
+    for root, dirs, files in os.walk('static'):
+        dirs.sort()
+        for file in sorted(files):
+            path = os.path.join(root, file)
+            with open(path, 'rb') as f:
+                sources[os.path.relpath(path, 'static').replace(os.sep, '/')] = f.read()
+    sources['url-mapping.js'] = url_mapping_js().encode('utf-8')
+
+    generate_static.ASSET_MANIFEST.clear()
+    assets = {}
+    for path, content in sorted(sources.items()):
+        if os.path.splitext(path)[1] in FINGERPRINT_EXTENSIONS:
+            directory, file = os.path.split(path)
+            fingerprinted = '/'.join(filter(None, [directory, fingerprinted_name(file, content)]))
+            generate_static.ASSET_MANIFEST[path] = fingerprinted
+            path = fingerprinted
+        assets[f'static/{path}'] = content
+
+    assets[os.path.relpath(generate_static.ASSET_MANIFEST_PATH, DESTINATION)] = json.dumps(
+        generate_static.ASSET_MANIFEST, ensure_ascii=False, indent=2, sort_keys=True).encode('utf-8')
+    return assets
+
+
+def write_if_changed(path, content):
+    """Пишет файл, только если содержимое отличается; True, если файл записан"""
+    try:
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return True
+
+
+def _init_worker(asset_manifest):
+    """Процессу-исполнителю нужны отпечатки ассетов для переписывания ссылок"""
+    generate_static.ASSET_MANIFEST.clear()
+    generate_static.ASSET_MANIFEST.update(asset_manifest)
+
+
+def render_pages(pages, destination=DESTINATION):
+    """Рендерит и записывает пачку страниц манифеста; возвращает пути записанных"""
+    # Сборка проходит по всем страницам, поэтому архив держится разобранным целиком
+    main.HISTORY.capacity = None
+    written = []
+    with app.test_client() as client:
+        for url, path, current_path in pages:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url}: {response.status_code}')
+            if current_path is None:
+                content = response.get_data()
+            else:
+                content = fix_github_pages_links(response.get_data(as_text=True), current_path).encode('utf-8')
+            if write_if_changed(os.path.join(destination, path), content):
+                written.append(path)
+    return written
+
+
+def remove_stale(destination, keep):
+    """Удаляет из destination файлы не из манифеста и опустевшие папки"""
+    removed = []
+    for root, dirs, files in os.walk(destination, topdown=False):
+        for file in files:
+            path = os.path.relpath(os.path.join(root, file), destination).replace(os.sep, '/')
+            if path in keep or any(fnmatch(part, pattern) for part in path.split('/') for pattern in DESTINATION_IGNORE):
+                continue
+            os.remove(os.path.join(root, file))
+            removed.append(path)
+        if root != destination and not os.listdir(root):
+            os.rmdir(root)
+    return removed
+
+
+def freeze(destination=DESTINATION, workers=FREEZE_WORKERS):
+    """Собирает сайт в destination; возвращает статистику сборки"""
+    started = time.perf_counter()
+    assets = asset_files()
+    pages = page_manifest()
+
+    written = [path for path, content in assets.items()
+               if write_if_changed(os.path.join(destination, path), content)]
+    tasks = [pages[i:i + PAGES_PER_TASK] for i in range(0, len(pages), PAGES_PER_TASK)]
+    if workers > 1 and len(tasks) > 1:
+        # fork наследует уже загруженные данные; где его нет, процессы загрузят их сами
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(dict(generate_static.ASSET_MANIFEST),)) as pool:
+            for paths in pool.map(render_pages, tasks, [destination] * len(tasks)):
+                written += paths
+    else:
+        for task in tasks:
+            written += render_pages(task, destination)
+
+    # Конфигурация nginx лежит вне destination и в манифест страниц не входит
+    if write_if_changed(generate_static.NGINX_CONFIG_PATH, generate_static.nginx_config().encode('utf-8')):
+        written.append(generate_static.NGINX_CONFIG_PATH)
+
+    removed = remove_stale(destination, set(assets) | {path for _, path, _ in pages})
+    return {
+        'pages': len(pages),
+        'files': len(assets) + len(pages) + 1,  # + конфигурация nginx
+        'written': len(written),
+        'removed': len(removed),
+        'seconds': time.perf_counter() - started,
+    }
 
-@freezer.register_generator
-def lecturer_detail():
-    """Генерирует URL для всех страниц лекторов"""
-    for lecturer_name in LECTURERS.keys():
-        yield {'name': lecturer_name}
 
 if __name__ == '__main__':
-    # Удаляем старую папку docs если она существует
-    if os.path.exists('docs'):
-        shutil.rmtree('docs')
-        print("Старая папка 'docs' удалена")
-    
-    # Создаем новую папку docs
-    os.makedirs('docs')
-    print("Создана новая папка 'docs'")
-    
     try:
-        # Генерируем статические файлы
         print("Генерация статических файлов...")
-        freezer.freeze()
-        print("✅ Статические файлы успешно созданы в папке 'docs'")
-        print("📁 Структура файлов:")
-        
-        # Показываем структуру созданных файлов
-        for root, dirs, files in os.walk('docs'):
-            level = root.replace('docs', '').count(os.sep)
-            indent = ' ' * 2 * level
-            print(f"{indent}{os.path.basename(root)}/")
-            subindent = ' ' * 2 * (level + 1)
-            for file in files:
-                print(f"{subindent}{file}")
-        
+        stats = freeze()
+        print(f"✅ {stats['pages']} страниц за {stats['seconds']:.2f} с: записано файлов {stats['written']}, "
+              f"удалено {stats['removed']}, без изменений {stats['files'] - stats['written']}")
         print("\n🚀 Теперь можно загрузить содержимое папки 'docs' на GitHub Pages")
         
     except Exception as e:
         print(f"❌ Ошибка при генерации: {e}")
-        print("Попробуйте запустить скрипт еще раз")
\ No newline at end of file
+        sys.exit(1)
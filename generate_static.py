@@ -3,17 +3,62 @@
 Генератор статических HTML файлов для GitHub Pages
 """
 
+import hashlib
+import json
 import os
 import shutil
 from urllib.parse import quote
-from main import app, LECTURERS
+from main import app, LECTURERS, PRACTITIONERS, subject_names
 
 def safe_filename(name):
     """Создает безопасное имя файла из имени лектора"""
-    # Заменяем проблемные символы
-    safe_name = name.replace(' ', '_').replace('/', '_').replace('\\', '_')
+    # Заменяем проблемные символы, в том числе особые для URL
+    safe_name = name.replace(' ', '_').replace('/', '_').replace('\\', '_').replace('?', '_').replace('#', '_').replace('%', '_')
     return safe_name
 
+# Отпечатки ассетов: CSS/JS получают в имени хэш содержимого (styles.3fa9c1d2e4b5.css),
+# поэтому их можно кэшировать на год, а при изменении меняется и имя файла
+FINGERPRINT_EXTENSIONS = ('.css', '.js')
+FINGERPRINT_LENGTH = 12
+ASSET_MANIFEST_PATH = 'docs/asset-manifest.json'
+NGINX_CONFIG_PATH = 'nginx/cache-headers.conf'
+
+# Исходный путь ассета внутри static/ -> путь с отпечатком; заполняется при генерации
+ASSET_MANIFEST = {}
+
+# Разделы сайта: страницы первого уровня и (кроме отзывов) папки со страницами по именам
+SECTIONS = ["lecturers", "reviews", "practitioners", "subjects"]
+
+def fix_detail_links(html_content, current_path, section, names):
+    """Заменяет ссылки /<section>/<имя> (с APPLICATION_ROOT и без) на относительные пути
+    
+    Все ссылки раздела находятся одним проходом регулярного выражения, а имя
+    ищется в словаре — время не зависит от того, сколько всего преподавателей.
+    """
+    import re
+    
+    if current_path == "":  # с главной страницы
+        prefix = f'{section}/'
+    elif current_path == section:  # со страницы списка этого раздела
+        prefix = ''
+    elif current_path in SECTIONS:  # с других страниц первого уровня
+        prefix = f'../{section}/'
+    else:  # со страниц второго уровня (section/name/)
+        prefix = f'../../{section}/'
+    
+    # Ссылки бывают и с закодированным именем (url_for), и с обычным
+    safe_names = {}
+    for name in names:
+        safe_name = safe_filename(name)
+        safe_names.setdefault(quote(name.encode('utf-8')), safe_name)
+        safe_names.setdefault(name, safe_name)
+    
+    def replace(match):
+        safe_name = safe_names.get(match.group(1))
+        return match.group(0) if safe_name is None else f'href="{prefix}{safe_name}/"'
+    
+    return re.sub(f'href="(?:/ITMOHistoryFeedback)?/{section}/([^"]*)"', replace, html_content)
+
 def fix_github_pages_links(html_content, current_path=""):
     """Исправляет ссылки для работы на GitHub Pages"""
     import re
@@ -21,64 +66,90 @@ def fix_github_pages_links(html_content, current_path=""):
     # Определяем базовый путь в зависимости от текущей страницы
     if current_path == "":  # главная страница
         base_path = "./"
-    elif current_path in ["lecturers", "reviews"]:  # страницы первого уровня
+    elif current_path in SECTIONS:  # страницы первого уровня
         base_path = "../"
-    else:  # страницы лекторов (lecturers/name/)
+    else:  # страницы лекторов, практиков и предметов (section/name/)
         base_path = "../../"
     
     # Исправляем ссылки на статические файлы
     html_content = re.sub(r'href="/static/', f'href="{base_path}static/', html_content)
     html_content = re.sub(r'src="/static/', f'src="{base_path}static/', html_content)
+    for original, fingerprinted in ASSET_MANIFEST.items():
+        html_content = html_content.replace(f'static/{original}"', f'static/{fingerprinted}"')
     
     # Исправляем навигационные ссылки с учетом APPLICATION_ROOT
     # Заменяем абсолютные пути с APPLICATION_ROOT на относительные
-    if current_path == "":
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/"', 'href="index.html"', html_content)
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/lecturers"', 'href="lecturers/"', html_content)
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/reviews"', 'href="reviews/"', html_content)
-        # Также обрабатываем старые пути без APPLICATION_ROOT
-        html_content = re.sub(r'href="/"', 'href="index.html"', html_content)
-        html_content = re.sub(r'href="/lecturers"', 'href="lecturers/"', html_content)
-        html_content = re.sub(r'href="/reviews"', 'href="reviews/"', html_content)
-    elif current_path in ["lecturers", "reviews"]:
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/"', 'href="../"', html_content)
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/lecturers"', 'href="../lecturers/"', html_content)
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/reviews"', 'href="../reviews/"', html_content)
-        # Также обрабатываем старые пути без APPLICATION_ROOT
-        html_content = re.sub(r'href="/"', 'href="../"', html_content)
-        html_content = re.sub(r'href="/lecturers"', 'href="../lecturers/"', html_content)
-        html_content = re.sub(r'href="/reviews"', 'href="../reviews/"', html_content)
-    else:  # страницы лекторов
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/"', 'href="../../"', html_content)
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/lecturers"', 'href="../../lecturers/"', html_content)
-        html_content = re.sub(r'href="/ITMOHistoryFeedback/reviews"', 'href="../../reviews/"', html_content)
-        # Также обрабатываем старые пути без APPLICATION_ROOT
-        html_content = re.sub(r'href="/"', 'href="../../"', html_content)
-        html_content = re.sub(r'href="/lecturers"', 'href="../../lecturers/"', html_content)
-        html_content = re.sub(r'href="/reviews"', 'href="../../reviews/"', html_content)
-    
-    # Исправляем ссылки на лекторов
-    for lecturer_name in LECTURERS.keys():
-        safe_name = safe_filename(lecturer_name)
-        encoded_name = quote(lecturer_name.encode('utf-8'))
-        
-        # Заменяем ссылки вида /lecturers/Имя%20Лектора на относительные пути
-        pattern = f'href="/lecturers/{re.escape(encoded_name)}"'
-        if current_path == "":  # с главной страницы
-            replacement = f'href="lecturers/{safe_name}/"'
-        elif current_path == "lecturers":  # со страницы списка лекторов
-            replacement = f'href="{safe_name}/"'
-        else:  # с других страниц
-            replacement = f'href="../{safe_name}/"'
-        
-        html_content = re.sub(pattern, replacement, html_content)
-        
-        # Также обрабатываем не-encoded версии
-        pattern2 = f'href="/lecturers/{re.escape(lecturer_name)}"'
-        html_content = re.sub(pattern2, replacement, html_content)
+    home = 'index.html' if current_path == "" else base_path
+    html_content = re.sub(r'href="/ITMOHistoryFeedback/"', f'href="{home}"', html_content)
+    # Также обрабатываем старые пути без APPLICATION_ROOT
+    html_content = re.sub(r'href="/"', f'href="{home}"', html_content)
+    for section in SECTIONS:
+        prefix = "" if current_path == "" else base_path
+        html_content = re.sub(f'href="(?:/ITMOHistoryFeedback)?/{section}"', f'href="{prefix}{section}/"', html_content)
+    
+    # Исправляем ссылки на страницы лекторов, практиков и предметов
+    html_content = fix_detail_links(html_content, current_path, "lecturers", LECTURERS.keys())
+    html_content = fix_detail_links(html_content, current_path, "practitioners", PRACTITIONERS.keys())
+    html_content = fix_detail_links(html_content, current_path, "subjects", subject_names())
     
     return html_content
 
+def fingerprinted_name(filename, content):
+    """'styles.css' -> 'styles.<хэш содержимого>.css'"""
+    stem, ext = os.path.splitext(filename)
+    digest = hashlib.sha256(content).hexdigest()[:FINGERPRINT_LENGTH]
+    return f'{stem}.{digest}{ext}'
+
+def fingerprint_assets(static_dir='docs/static'):
+    """Переименовывает CSS/JS в static_dir по хэшу содержимого и заполняет ASSET_MANIFEST"""
+    ASSET_MANIFEST.clear()
+    for root, dirs, files in os.walk(static_dir):
+        dirs.sort()
+        for file in sorted(files):
+            if os.path.splitext(file)[1] not in FINGERPRINT_EXTENSIONS:
+                continue
+            path = os.path.join(root, file)
+            with open(path, 'rb') as f:
+                fingerprinted = fingerprinted_name(file, f.read())
+            os.replace(path, os.path.join(root, fingerprinted))
+            
+            relative_dir = os.path.relpath(root, static_dir).replace(os.sep, '/')
+            prefix = '' if relative_dir == '.' else f'{relative_dir}/'
+            ASSET_MANIFEST[prefix + file] = prefix + fingerprinted
+    
+    with open(ASSET_MANIFEST_PATH, 'w', encoding='utf-8') as f:
+        json.dump(ASSET_MANIFEST, f, ensure_ascii=False, indent=2, sort_keys=True)
+    
+    print(f"Отпечатки добавлены к {len(ASSET_MANIFEST)} файлам, манифест: {ASSET_MANIFEST_PATH}")
+    return ASSET_MANIFEST
+
+def nginx_config():
+    """Заголовки кэширования для nginx: ассеты с отпечатком — на год, остальное — с ревалидацией"""
+    extensions = '|'.join(ext.lstrip('.') for ext in FINGERPRINT_EXTENSIONS)
+    return f"""# Сгенерировано при сборке сайта — include внутри server {{ }} с root на папку docs
+# (заменяет собственный location /)
+
+# Ассеты с хэшем содержимого в имени не меняются никогда
+location ~* "\\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}\\.({extensions})$" {{
+    add_header Cache-Control "public, max-age=31536000, immutable";
+    try_files $uri =404;
+}}
+
+# HTML, манифест и данные всегда проверяются у сервера
+location / {{
+    add_header Cache-Control "no-cache";
+    try_files $uri $uri/ =404;
+}}
+"""
+
+def create_nginx_config():
+    """Пишет nginx_config() в NGINX_CONFIG_PATH"""
+    os.makedirs(os.path.dirname(NGINX_CONFIG_PATH), exist_ok=True)
+    with open(NGINX_CONFIG_PATH, 'w', encoding='utf-8') as f:
+        f.write(nginx_config())
+    
+    print(f"Заголовки кэширования для nginx: {NGINX_CONFIG_PATH}")
+
 def generate_static_site():
     """Генерирует статический сайт"""
     
@@ -91,11 +162,17 @@ def generate_static_site():
     os.makedirs('docs', exist_ok=True)
     os.makedirs('docs/lecturers', exist_ok=True)
     os.makedirs('docs/reviews', exist_ok=True)
+    os.makedirs('docs/practitioners', exist_ok=True)
+    os.makedirs('docs/subjects', exist_ok=True)
     
-    # Копируем статические файлы (CSS)
+    # Копируем статические файлы (CSS) и маппинг URL, затем добавляем отпечатки —
+    # до рендеринга, чтобы страницы сразу ссылались на переименованные файлы
     if os.path.exists('static'):
         shutil.copytree('static', 'docs/static', dirs_exist_ok=True)
         print("Статические файлы (CSS/JS) скопированы")
+    create_url_mapping()
+    fingerprint_assets('docs/static')
+    create_nginx_config()
     
     with app.app_context():
         # Генерируем главную страницу
@@ -125,6 +202,31 @@ def generate_static_site():
             with open('docs/reviews/index.html', 'w', encoding='utf-8') as f:
                 f.write(fixed_html)
         
+        # Генерируем страницу практиков
+        print("Генерация страницы практиков...")
+        with app.test_client() as client:
+            response = client.get('/practitioners')
+            html_content = response.get_data(as_text=True)
+            fixed_html = fix_github_pages_links(html_content, "practitioners")
+            with open('docs/practitioners/index.html', 'w', encoding='utf-8') as f:
+                f.write(fixed_html)
+        
+        # Генерируем страницу предметов
+        print("Генерация страницы предметов...")
+        with app.test_client() as client:
+            response = client.get('/subjects')
+            html_content = response.get_data(as_text=True)
+            fixed_html = fix_github_pages_links(html_content, "subjects")
+            with open('docs/subjects/index.html', 'w', encoding='utf-8') as f:
+                f.write(fixed_html)
+        
+        # Распределения оценок по преподавателям в JSON
+        print("Генерация stats.json...")
+        with app.test_client() as client:
+            response = client.get('/stats.json')
+            with open('docs/stats.json', 'wb') as f:
+                f.write(response.get_data())
+        
         # Генерируем страницы для каждого лектора
         print("Генерация страниц лекторов...")
         for lecturer_name in LECTURERS.keys():
@@ -133,7 +235,7 @@ def generate_static_site():
             os.makedirs(lecturer_dir, exist_ok=True)
             
             with app.test_client() as client:
-                response = client.get(f'/lecturers/{lecturer_name}')
+                response = client.get(f'/lecturers/{quote(lecturer_name)}')
                 if response.status_code == 200:
                     html_content = response.get_data(as_text=True)
                     fixed_html = fix_github_pages_links(html_content, f"lecturers/{safe_name}")
@@ -143,6 +245,42 @@ def generate_static_site():
                 else:
                     print(f"  ✗ Ошибка для {lecturer_name}: {response.status_code}")
     
+        # Генерируем страницы для каждого практика
+        print("Генерация страниц практиков...")
+        for practitioner_name in PRACTITIONERS.keys():
+            safe_name = safe_filename(practitioner_name)
+            practitioner_dir = f'docs/practitioners/{safe_name}'
+            os.makedirs(practitioner_dir, exist_ok=True)
+            
+            with app.test_client() as client:
+                response = client.get(f'/practitioners/{quote(practitioner_name)}')
+                if response.status_code == 200:
+                    html_content = response.get_data(as_text=True)
+                    fixed_html = fix_github_pages_links(html_content, f"practitioners/{safe_name}")
+                    with open(f'{practitioner_dir}/index.html', 'w', encoding='utf-8') as f:
+                        f.write(fixed_html)
+                    print(f"  ✓ {practitioner_name}")
+                else:
+                    print(f"  ✗ Ошибка для {practitioner_name}: {response.status_code}")
+    
+        # Генерируем страницы для каждого предмета
+        print("Генерация страниц предметов...")
+        for subject_name in subject_names():
+            safe_name = safe_filename(subject_name)
+            subject_dir = f'docs/subjects/{safe_name}'
+            os.makedirs(subject_dir, exist_ok=True)
+            
+            with app.test_client() as client:
+                response = client.get(f'/subjects/{quote(subject_name)}')
+                if response.status_code == 200:
+                    html_content = response.get_data(as_text=True)
+                    fixed_html = fix_github_pages_links(html_content, f"subjects/{safe_name}")
+                    with open(f'{subject_dir}/index.html', 'w', encoding='utf-8') as f:
+                        f.write(fixed_html)
+                    print(f"  ✓ {subject_name}")
+                else:
+                    print(f"  ✗ Ошибка для {subject_name}: {response.status_code}")
+    
     print("\n✅ Генерация завершена!")
     print("📁 Структура файлов:")
     
@@ -155,8 +293,8 @@ def generate_static_site():
         for file in files:
             print(f"{subindent}{file}")
 
-def create_url_mapping():
-    """Создает файл с маппингом URL для правильных ссылок"""
+def url_mapping_js():
+    """JavaScript с маппингом имён лекторов на папки их страниц"""
     mapping = {}
     for lecturer_name in LECTURERS.keys():
         safe_name = safe_filename(lecturer_name)
@@ -186,15 +324,18 @@ document.addEventListener('DOMContentLoaded', function() {{
     }});
 }});
 """
-    
+    return js_content
+
+def create_url_mapping():
+    """Создает файл с маппингом URL для правильных ссылок"""
+    os.makedirs('docs/static', exist_ok=True)
     with open('docs/static/url-mapping.js', 'w', encoding='utf-8') as f:
-        f.write(js_content)
+        f.write(url_mapping_js())
     
     print("📝 Создан файл маппинга URL")
 
 if __name__ == '__main__':
     generate_static_site()
-    create_url_mapping()
     print("\n🚀 Сайт готов для GitHub Pages!")
     print("📋 Следующие шаги:")
     print("1. Загрузите содержимое папки 'docs' в ваш GitHub репозиторий")
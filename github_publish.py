@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Публикация данных и сгенерированного сайта одним коммитом через Git Data API
+
+Вместо PUT в contents API и отдельного запуска GitHub Action: сайт
+собирается локально, а файл с данными и docs/ уходят в репозиторий одним
+коммитом (blobs -> tree -> commit -> ref). Blob'ы, чей git-хэш совпадает с
+уже лежащим в репозитории, не загружаются; остальные загружаются
+параллельно. Если ветка успела сдвинуться, коммит пересобирается поверх
+нового HEAD.
+
+    python github_publish.py                # опубликовать текущие данные и docs/
+    python github_publish.py --build        # сначала пересобрать docs/
+    python github_publish.py --stub         # прогон против локальной заглушки GitHub
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "YOUR_GITHUB_TOKEN")
+GITHUB_REPO = os.environ.get("GITHUB_REPO", "username/repo-name")
+GITHUB_API_BASE = os.environ.get("GITHUB_API_BASE", "https://api.github.com")
+GITHUB_BRANCH = os.environ.get("GITHUB_BRANCH", "main")
+
+# Пути в репозитории
+DATA_FILE = 'data/fidbek po istorii.json'
+SITE_PATH = 'docs'
+# Локальная папка сборки; можно переопределить, например на временную (webhook_loadtest.py)
+SITE_DIR = os.environ.get('SITE_DIR', SITE_PATH)
+BLOB_WORKERS = 8
+# Сколько раз пересобирать коммит, если ветку сдвинули между чтением HEAD и обновлением ref
+PUBLISH_ATTEMPTS = 3
+
+
+class PublishError(Exception):
+    """Ошибка Git Data API; status — HTTP-код ответа"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def git_blob_sha(content):
+    """SHA-1 blob'а так, как его считает git: по заголовку 'blob <размер>\\0' и содержимому"""
+    return hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+
+
+class GitDataClient:
+    """Тонкая обёртка над /repos/<repo>/git/*"""
+
+    def __init__(self, api_base, repo, token, timeout=30):
+        self.api_url = f'{api_base}/repos/{repo}'
+        self.headers = {
+            'Authorization': f'token {token}',
+            'Accept': 'application/vnd.github.v3+json',
+        }
+        self.timeout = timeout
+        # requests.Session не рассчитан на общий доступ из потоков — у каждого свой
+        self._local = threading.local()
+
+    def _request(self, method, path, **kwargs):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        response = session.request(method, f'{self.api_url}{path}', headers=self.headers,
+                                    timeout=self.timeout, **kwargs)
+        if response.status_code not in (200, 201):
+            raise PublishError(f'{method} {path}: {response.status_code} {response.text[:200]}',
+                               response.status_code)
+        return response.json()
+
+    def head(self, branch):
+        return self._request('GET', f'/git/ref/heads/{branch}')['object']['sha']
+
+    def commit_tree(self, commit_sha):
+        return self._request('GET', f'/git/commits/{commit_sha}')['tree']['sha']
+
+    def tree(self, tree_sha):
+        """Все blob'ы дерева: путь -> sha"""
+        data = self._request('GET', f'/git/trees/{tree_sha}', params={'recursive': '1'})
+        if data.get('truncated'):
+            # Без полного списка нельзя ни пропускать blob'ы, ни удалять файлы
+            raise PublishError(f'Дерево {tree_sha} слишком большое для recursive=1')
+        return {entry['path']: entry['sha'] for entry in data['tree'] if entry['type'] == 'blob'}
+
+    def create_blob(self, content):
+        data = self._request('POST', '/git/blobs', json={
+            'content': base64.b64encode(content).decode('ascii'),
+            'encoding': 'base64',
+        })
+        return data['sha']
+
+    def create_tree(self, base_tree, entries):
+        return self._request('POST', '/git/trees', json={'base_tree': base_tree, 'tree': entries})['sha']
+
+    def create_commit(self, message, tree_sha, parents):
+        return self._request('POST', '/git/commits', json={
+            'message': message, 'tree': tree_sha, 'parents': parents,
+        })['sha']
+
+    def update_ref(self, branch, commit_sha):
+        self._request('PATCH', f'/git/refs/heads/{branch}', json={'sha': commit_sha, 'force': False})
+
+
+def site_files(site_dir=SITE_DIR):
+    """Содержимое собранного сайта: путь в репозитории (под SITE_PATH) -> байты"""
+    files = {}
+    for root, dirs, names in os.walk(site_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                files[f'{SITE_PATH}/' + os.path.relpath(path, site_dir).replace(os.sep, '/')] = f.read()
+    return files
+
+
+def publish(client, files, message, branch=GITHUB_BRANCH, prune=(SITE_PATH + '/',), workers=BLOB_WORKERS):
+    """Коммитит files (путь -> байты) в branch одним коммитом
+
+    Файлы под префиксами prune, которых нет в files, удаляются — так из docs/
+    уходят страницы исчезнувших преподавателей. Возвращает статистику;
+    commit равен None, если в репозитории уже лежит то же самое.
+    """
+    uploaded = set()            # blob'ы, загруженные в предыдущих попытках
+    for attempt in range(1, PUBLISH_ATTEMPTS + 1):
+        head = client.head(branch)
+        base_tree = client.commit_tree(head)
+        remote = client.tree(base_tree)
+
+        shas = {path: git_blob_sha(content) for path, content in files.items()}
+        changed = [path for path in files if remote.get(path) != shas[path]]
+        deleted = [path for path in remote if path.startswith(prune) and path not in files]
+        stats = {'commit': None, 'changed': len(changed), 'deleted': len(deleted),
+                 'unchanged': len(files) - len(changed), 'uploaded': 0, 'attempts': attempt}
+        if not changed and not deleted:
+            return stats
+
+        # Одинаковые файлы (например, пустые) дают один blob — загружаем его один раз
+        pending = {shas[path]: files[path] for path in changed if shas[path] not in uploaded}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for expected, actual in zip(pending, pool.map(client.create_blob, pending.values())):
+                if actual != expected:
+                    raise PublishError(f'GitHub вернул blob {actual}, ожидался {expected}')
+                uploaded.add(actual)
+        stats['uploaded'] = len(pending)
+
+        entries = [{'path': path, 'mode': '100644', 'type': 'blob', 'sha': shas[path]} for path in changed]
+        entries += [{'path': path, 'mode': '100644', 'type': 'blob', 'sha': None} for path in deleted]
+        tree_sha = client.create_tree(base_tree, entries)
+        commit_sha = client.create_commit(message, tree_sha, [head])
+        try:
+            client.update_ref(branch, commit_sha)
+        except PublishError as e:
+            # 422 — не fast-forward: кто-то успел запушить, пересобираем поверх нового HEAD
+            if e.status != 422 or attempt == PUBLISH_ATTEMPTS:
+                raise
+            print(f"⚠️ Ветка {branch} сдвинулась, повтор {attempt + 1}/{PUBLISH_ATTEMPTS}")
+            continue
+        stats['commit'] = commit_sha
+        return stats
+
+
+def publish_site(data_content=None, build=False, client=None, message=None, branch=GITHUB_BRANCH):
+    """Публикует файл с данными и docs/ одним коммитом
+
+    data_content — новые байты файла с данными (записываются локально перед
+    сборкой); build — пересобрать docs/ из текущих данных.
+    """
+    import main
+
+    if data_content is not None:
+        os.makedirs(os.path.dirname(main.DATA_PATH), exist_ok=True)
+        with open(main.DATA_PATH, 'wb') as f:
+            f.write(data_content)
+    if build:
+        import freeze
+        main.load_data()
+        stats = freeze.freeze(SITE_DIR)
+        print(f"🏗️ Сборка: {stats['pages']} страниц за {stats['seconds']:.2f} с, записано файлов {stats['written']}")
+
+    files = site_files(SITE_DIR)
+    with open(main.DATA_PATH, 'rb') as f:
+        files[DATA_FILE] = f.read()
+
+    if client is None:
+        client = GitDataClient(GITHUB_API_BASE, GITHUB_REPO, GITHUB_TOKEN)
+    message = message or f'Auto-update data and site - {datetime.now().strftime("%Y-%m-%d %H:%M:%S")}'
+    return publish(client, files, message, branch)
+
+
+def print_stats(stats, seconds):
+    if stats['commit'] is None:
+        print(f"✅ Изменений нет ({stats['unchanged']} файлов совпадают), {seconds:.2f} с")
+        return
+    print(f"✅ Коммит {stats['commit'][:12]}: изменено {stats['changed']}, удалено {stats['deleted']}, "
+          f"без изменений {stats['unchanged']}; загружено blob'ов: {stats['uploaded']}, "
+          f"попыток: {stats['attempts']}, {seconds:.2f} с")
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--build', action='store_true', help='пересобрать docs/ перед публикацией')
+    parser.add_argument('--branch', default=GITHUB_BRANCH)
+    parser.add_argument('--message', help='сообщение коммита')
+    parser.add_argument('--stub', action='store_true',
+                        help='публиковать в локальную заглушку GitHub (дважды: второй раз без изменений)')
+    args = parser.parse_args(argv)
+
+    stub = None
+    if args.stub:
+        from webhook_loadtest import GITHUB_PORT, GitHubStub
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        stub = GitHubStub(GITHUB_PORT)
+        stub.start()
+        client = GitDataClient(stub.base_url, 'loadtest/feedback', 'loadtest-token')
+    else:
+        if GITHUB_TOKEN == "YOUR_GITHUB_TOKEN":
+            print("⚠️ GitHub токен не настроен")
+            return 1
+        client = GitDataClient(GITHUB_API_BASE, GITHUB_REPO, GITHUB_TOKEN)
+
+    try:
+        for run in range(2 if stub else 1):
+            started = time.perf_counter()
+            stats = publish_site(build=args.build and run == 0, client=client,
+                                 message=args.message, branch=args.branch)
+            print_stats(stats, time.perf_counter() - started)
+        if stub:
+            print('🌐 Обращения к заглушке: ' + json.dumps(dict(stub.calls), ensure_ascii=False))
+    finally:
+        if stub:
+            stub.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main_cli(sys.argv[1:]))
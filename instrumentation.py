@@ -0,0 +1,268 @@
+"""
+Замеры времени и профилирование запросов Flask
+
+Каждый запрос делится на фазы (подготовка данных, рендеринг шаблона), их
+длительность уходит в заголовок Server-Timing и в метрики для /metrics в
+текстовом формате Prometheus. Метрики хранятся в памяти процесса: под
+gunicorn каждый воркер отдаёт свои.
+
+Профилирование включается переменными окружения:
+    PROFILE_MODE=pstats   — cProfile для каждого запроса, .pstats для медленных
+    PROFILE_MODE=stacks   — сэмплирующий профайлер, свёрнутые стеки для flamegraph.pl
+    PROFILE_SLOW_MS=200   — порог «медленного» запроса
+    PROFILE_DIR=profiles  — куда складывать дампы
+"""
+
+import cProfile
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+
+from flask import Response, g, request
+
+PROFILE_MODE = os.environ.get('PROFILE_MODE', '')
+PROFILE_SLOW_MS = float(os.environ.get('PROFILE_SLOW_MS', '200'))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+SAMPLE_INTERVAL = float(os.environ.get('PROFILE_SAMPLE_INTERVAL_MS', '5')) / 1000
+
+# Границы корзин гистограммы длительности запросов, в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_lock = threading.Lock()
+_requests = Counter()                   # (endpoint, status) -> количество
+_latency_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))
+_latency_sum = Counter()                # endpoint -> сумма секунд
+_latency_count = Counter()              # endpoint -> количество
+_phase_sum = Counter()                  # (endpoint, phase) -> сумма секунд
+_response_bytes = Counter()             # endpoint -> сумма байт
+STARTUP_TIMINGS = {}                    # шаг запуска -> секунды
+
+
+@contextmanager
+def startup_timer(step):
+    """Замеряет шаг загрузки данных при старте приложения"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[step] = time.perf_counter() - start
+
+
+def start_phase(name):
+    """Закрывает текущую фазу запроса и открывает новую"""
+    if 'phases' not in g:
+        return
+    _close_phase()
+    g.current_phase = (name, time.perf_counter())
+
+
+def _close_phase():
+    current = g.pop('current_phase', None)
+    if current is not None:
+        name, start = current
+        g.phases.append((name, time.perf_counter() - start))
+
+
+class StackSampler:
+    """Периодически снимает стеки потоков, обрабатывающих запросы"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self._active = {}               # thread id -> Counter свёрнутых стеков
+        # Пока запросов нет, поток сэмплера спит на условии, а не просыпается каждые interval
+        self._active_changed = threading.Condition()
+        self._thread = None
+
+    def register(self, thread_id):
+        with self._active_changed:
+            self._active[thread_id] = Counter()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+                self._thread.start()
+            self._active_changed.notify()
+
+    def unregister(self, thread_id):
+        with self._active_changed:
+            return self._active.pop(thread_id, Counter())
+
+    def _run(self):
+        while True:
+            with self._active_changed:
+                self._active_changed.wait_for(lambda: self._active)
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._active_changed:
+                for thread_id, stacks in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        stacks[_fold(frame)] += 1
+
+
+def _fold(frame):
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+_sampler = StackSampler(SAMPLE_INTERVAL) if PROFILE_MODE == 'stacks' else None
+
+
+class _CountedBody:
+    """Тело потокового ответа, считающее байты по мере отправки"""
+
+    def __init__(self, response):
+        self._body = response.response
+        # iter_encoded() забирает response.response сразу, поэтому его можно подменить
+        self._encoded = response.iter_encoded()
+        self.size = 0
+
+    def __iter__(self):
+        for chunk in self._encoded:
+            self.size += len(chunk)
+            yield chunk
+
+    def close(self):
+        # Закрывает и недочитанное тело (HEAD, обрыв соединения), снимая контекст запроса
+        if hasattr(self._body, 'close'):
+            self._body.close()
+
+
+def _dump_path(endpoint, suffix):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    return os.path.join(PROFILE_DIR, f'{endpoint}-{stamp}.{suffix}')
+
+
+def _before_request():
+    g.phases = []
+    g.request_start = time.perf_counter()
+    if PROFILE_MODE == 'pstats':
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+    elif _sampler is not None:
+        _sampler.register(threading.get_ident())
+
+
+def _after_request(response):
+    if 'request_start' not in g:
+        return response
+    _close_phase()
+    endpoint = request.endpoint or 'unknown'
+    request_start = g.request_start
+    phases = g.phases
+    profiler = g.pop('profiler', None)
+    thread_id = threading.get_ident()
+    headers_sent_at = time.perf_counter()
+
+    # Для потоковых ответов заголовок уходит до рендеринга тела,
+    # поэтому в нём время только до первого байта
+    timing = [f'{name};dur={seconds * 1000:.2f}' for name, seconds in phases]
+    timing.append(f'total;dur={(headers_sent_at - request_start) * 1000:.2f}')
+    response.headers['Server-Timing'] = ', '.join(timing)
+
+    def finish():
+        now = time.perf_counter()
+        total = now - request_start
+        if response.is_streamed and phases:
+            # Генерация тела — продолжение последней фазы (рендеринга)
+            name, seconds = phases[-1]
+            phases[-1] = (name, seconds + now - headers_sent_at)
+
+        if profiler is not None:
+            profiler.disable()
+        stacks = _sampler.unregister(thread_id) if _sampler is not None else None
+
+        if total * 1000 >= PROFILE_SLOW_MS:
+            if profiler is not None:
+                profiler.dump_stats(_dump_path(endpoint, 'pstats'))
+            elif stacks:
+                with open(_dump_path(endpoint, 'folded'), 'w', encoding='utf-8') as f:
+                    for stack, count in stacks.items():
+                        f.write(f'{stack} {count}\n')
+
+        # Размер потокового ответа заранее неизвестен — берём отправленные байты
+        size = body.size if body is not None else response.calculate_content_length()
+        _record(endpoint, response.status_code, total, phases, size)
+
+    body = None
+    if response.is_streamed:
+        # Тело рендерится уже после after_request — досчитываем при закрытии ответа
+        body = response.response = _CountedBody(response)
+        response.call_on_close(finish)
+    else:
+        finish()
+    return response
+
+
+def _record(endpoint, status, total, phases, size):
+    with _lock:
+        _requests[(endpoint, status)] += 1
+        buckets = _latency_buckets[endpoint]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if total <= bound:
+                buckets[i] += 1
+        _latency_sum[endpoint] += total
+        _latency_count[endpoint] += 1
+        for name, seconds in phases:
+            _phase_sum[(endpoint, name)] += seconds
+        if size is not None:
+            _response_bytes[endpoint] += size
+
+
+def _metrics():
+    """Отдаёт накопленные метрики в текстовом формате Prometheus"""
+    lines = [
+        '# HELP feedback_startup_seconds Duration of data loading steps at startup.',
+        '# TYPE feedback_startup_seconds gauge',
+    ]
+    for step, seconds in STARTUP_TIMINGS.items():
+        lines.append(f'feedback_startup_seconds{{step="{step}"}} {seconds:.6f}')
+
+    with _lock:
+        lines += [
+            '# HELP feedback_requests_total Handled requests.',
+            '# TYPE feedback_requests_total counter',
+        ]
+        for (endpoint, status), count in sorted(_requests.items()):
+            lines.append(f'feedback_requests_total{{endpoint="{endpoint}",status="{status}"}} {count}')
+
+        lines += [
+            '# HELP feedback_request_duration_seconds Request latency.',
+            '# TYPE feedback_request_duration_seconds histogram',
+        ]
+        for endpoint in sorted(_latency_count):
+            for bound, count in zip(LATENCY_BUCKETS, _latency_buckets[endpoint]):
+                lines.append(f'feedback_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {count}')
+            lines.append(f'feedback_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {_latency_count[endpoint]}')
+            lines.append(f'feedback_request_duration_seconds_sum{{endpoint="{endpoint}"}} {_latency_sum[endpoint]:.6f}')
+            lines.append(f'feedback_request_duration_seconds_count{{endpoint="{endpoint}"}} {_latency_count[endpoint]}')
+
+        lines += [
+            '# HELP feedback_request_phase_seconds_total Time spent in each request phase.',
+            '# TYPE feedback_request_phase_seconds_total counter',
+        ]
+        for (endpoint, phase), seconds in sorted(_phase_sum.items()):
+            lines.append(f'feedback_request_phase_seconds_total{{endpoint="{endpoint}",phase="{phase}"}} {seconds:.6f}')
+
+        lines += [
+            '# HELP feedback_response_size_bytes_total Bytes sent in response bodies.',
+            '# TYPE feedback_response_size_bytes_total counter',
+        ]
+        for endpoint, size in sorted(_response_bytes.items()):
+            lines.append(f'feedback_response_size_bytes_total{{endpoint="{endpoint}"}} {size}')
+
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+
+def init_app(app):
+    """Подключает замеры к приложению и регистрирует /metrics"""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.add_url_rule('/metrics', 'metrics', _metrics)
@@ -1,15 +1,37 @@
-from flask import Flask, render_template, abort
+from flask import Flask, render_template, stream_with_context, abort, jsonify
 import json
+from array import array
 from collections import defaultdict
 import os
 
+import instrumentation
+from aggregates import ScoreIndex, parse_score
+from cube import FeedbackCube, MEASURES, cell_count, cell_mean
+from feedback_store import BlockCache, FeedbackArchive, FeedbackRef, FeedbackStore, archive_position, feedback_text
+from names import NameRegistry
+from shards import MemoryShards, ShardCache, ShardStore, ShardedGroup
+from trends import GRANULARITIES, TrendIndex, time_buckets
+from filter_index import build_filter_index
+from instrumentation import start_phase, startup_timer
+
 app = Flask(__name__)
+instrumentation.init_app(app)
 
 # Конфигурация для GitHub Pages
 # Устанавливаем APPLICATION_ROOT для работы с подпапкой
 app.config['APPLICATION_ROOT'] = '/ITMOHistoryFeedback'
+# Большие страницы (все отзывы, страница лектора) отдаются по мере рендеринга;
+# STREAM_TEMPLATES=0 возвращает обычный render_template
+app.config['STREAM_TEMPLATES'] = os.environ.get('STREAM_TEMPLATES', '1') != '0'
 
-DATA_PATH = 'data/fidbek po istorii.json'
+# Пути можно переопределить, например на синтетический набор (app_loadtest.py)
+DATA_PATH = os.environ.get('DATA_PATH', 'data/fidbek po istorii.json')
+# Шарды по семестрам и сводки закрытых семестров (генерируются из DATA_PATH)
+SHARDS_DIR = os.environ.get('SHARDS_DIR', 'data/shards')
+# Сколько групп (семестр, преподаватель) из прошлых семестров держать разобранными в памяти
+HISTORY_CACHE_GROUPS = int(os.environ.get('HISTORY_CACHE_GROUPS', '32'))
+# Сколько распакованных блоков текстов отзывов держать в памяти (по 16 КБ)
+FEEDBACK_CACHE_BLOCKS = int(os.environ.get('FEEDBACK_CACHE_BLOCKS', '64'))
 
 # _точные_ формулировки вопросов из вашего JSON
 SUBJECT_Q  = 'Какой предмет у тебя был?'
@@ -22,6 +44,10 @@ PRACTICE_INTEREST_Q = 'Оцени степень интересности пра
 LECTURER_FEEDBACK_Q = 'Что можешь рассказать о лекциях, преподавателе, что делали ? Тут можно расписать что угодно, всё что ты считаешь важным. Эта информация будет передана следующим поколениям.'
 PRACTICE_FEEDBACK_Q = 'Что можешь рассказать о практиках, преподавателе, чем занимались? Тут можно расписать что угодно, всё что ты считаешь важным. Эта информация будет передана следующим поколениям.'
 PRACTITIONER_Q = 'Кто у тебя был практиком?'
+CREATED_Q = 'Время создания'
+
+# Свободные тексты: хранятся сжатыми и разворачиваются только для показа
+FEEDBACK_QUESTIONS = (LECTURER_FEEDBACK_Q, PRACTICE_FEEDBACK_Q)
 
 SCORE_MIN = 1.0
 SCORE_MAX = 10.0
@@ -35,6 +61,12 @@ DEFAULT_LECTURERS = {
     'История российской науки и техники':      'Васильев Андрей Владимирович, Белоусов Александр Сергеевич',
 }
 
+# Другие написания имён преподавателей -> каноническое имя.
+# Пробелы, регистр и ё/е нормализуются автоматически, сюда — только
+# настоящие варианты, например: 'Пригодич Н. Д.': 'Пригодич Никита Дмитриевич'
+NAME_ALIASES = {
+}
+
 # Краткие названия предметов - здесь можете настроить как нужно
 SUBJECT_SHORT_NAMES = {
     'Реформы и реформаторы в истории России': 'Реформы и реформаторы',
@@ -45,6 +77,18 @@ SUBJECT_SHORT_NAMES = {
     'История российской науки и техники': 'Наука и техника',
 }
 
+# Оценки, по которым строятся гистограммы: ключ в сводке -> вопрос
+LECTURE_SCORES = {
+    'lecture_complexity': LECTURE_COMPLEXITY_Q,
+    'lecture_interest':   LECTURE_INTEREST_Q,
+}
+PRACTICE_SCORES = {
+    'practice_complexity': PRACTICE_COMPLEXITY_Q,
+    'practice_interest':   PRACTICE_INTEREST_Q,
+}
+
+SCORE_QUESTIONS = {**LECTURE_SCORES, **PRACTICE_SCORES}
+
 ALIAS_FIELDS = {
     SUBJECT_Q:  'subject',
     LECTURER_Q: 'lecturer',
@@ -55,198 +99,460 @@ def load_raw():
     with open(DATA_PATH, 'r', encoding='utf-8') as f:
         return json.load(f)
 
-def parse_responses(raw):
-    parsed = []
-    for entry in raw:
-        temp = defaultdict(list)
-        for question, answer in entry:
-            temp[question].append(answer)
+def parse_batch(entries):
+    """Парсит пачку ответов за один проход по парам [вопрос, ответ]
 
-        # 1. Собираем ответы (самый длинный, если их несколько)
-        record = {}
-        for q, vals in temp.items():
-            record[q] = vals[0] if len(vals) == 1 else max(vals, key=lambda s: len(s or ''))
+    Для повторяющихся вопросов (например, пять вопросов о практике) хранится
+    только текущий лучший ответ: побеждает самый длинный, при равной длине —
+    встретившийся первым. Тексты отзывов остаются строками: в сжатое
+    хранилище их переносит FeedbackStore.compress().
+    """
+    defaults = DEFAULT_LECTURERS
+    aliases = tuple(ALIAS_FIELDS.items())
+    intern, intern_many = NAMES.intern, NAMES.intern_many
+    intern_subject = SUBJECTS.intern
+    unknown_id = intern('—')
+    parsed = []
+    append = parsed.append
+    for entry in entries:
+        # 1. Первый ответ на каждый вопрос; повторы проверяем только если они есть
+        record = dict(reversed(entry))
+        if len(record) != len(entry):
+            for question, answer in entry:
+                if answer:
+                    current = record[question]
+                    if answer is not current and len(answer) > len(current or ''):
+                        record[question] = answer
 
         # 2. Если по вопросу о лекторе только '—', подменяем сразу в этом ключе
         subj = record.get(SUBJECT_Q, '')
-        if record.get(LECTURER_Q, '—') in ('', '—') and subj in DEFAULT_LECTURERS:
-            record[LECTURER_Q] = DEFAULT_LECTURERS[subj]
+        if record.get(LECTURER_Q, '—') in ('', '—') and subj in defaults:
+            record[LECTURER_Q] = defaults[subj]
 
         # 3. Дублируем в короткие alias-поля
-        for long_key, short_key in ALIAS_FIELDS.items():
+        for long_key, short_key in aliases:
             record[short_key] = record.get(long_key, '—')
 
-        parsed.append(record)
+        # 4. Интернируем предмет и имена: соавторы-лекторы через запятую, практик — один.
+        #    Пустой ответ (None) попадает в группу '—'
+        record['subject_id'] = intern_subject(record['subject'] or '—')
+        record['lecturer_ids'] = intern_many(record['lecturer'] or '—') or (unknown_id,)
+        practitioner = record.get(PRACTITIONER_Q)
+        record['practitioner_id'] = intern(practitioner) if practitioner and practitioner.strip() and practitioner != '—' else None
+
+        append(record)
     return parsed
 
+def parse_responses(raw):
+    return parse_batch(raw)
+
+def feedback_group(record):
+    """Тексты отзывов хранятся блоками по (предмет, лектор), чтобы страницы распаковывали только свои блоки"""
+    return record['subject_id'], record['lecturer_ids'][0]
+
 
 
 def aggregate_by(question_text):
     groups = defaultdict(list)
-    for r in RESPONSES:
+    for r in all_responses():
         # если вопрос вдруг отсутствует — попадёт в группу '—'
         key = r.get(question_text, '—')
         groups[key].append(r)
     return groups
 
-# загрузка и парсинг
-RAW = load_raw()
-RESPONSES = parse_responses(RAW)
-
 def group_by(field):
     groups = defaultdict(list)
-    for r in RESPONSES:
+    for r in all_responses():
         # На всякий случай: если поля нет или None, попадёт в группу '—'
         key = r.get(field) or '—'
         groups[key].append(r)
     return groups
 
+def practitioner_id_of(record, lecturer_id):
+    """ID практика из ответа; если не указан — ID лектора"""
+    practitioner_id = record['practitioner_id']
+    return lecturer_id if practitioner_id is None else practitioner_id
+
+def practitioner_ids_of(record):
+    """ID практиков ответа; если практик не указан, практики вели сами лекторы"""
+    practitioner_id = record['practitioner_id']
+    return record['lecturer_ids'] if practitioner_id is None else (practitioner_id,)
+
+def accumulate(record, scores, cube, practitioner_lecturers, trends):
+    """Добавляет оценки ответа в гистограммы, куб, ряды по времени и счётчики (практик, лектор)"""
+    lecturer_ids = record['lecturer_ids']
+    measures = [parse_score(record.get(SCORE_QUESTIONS[measure])) for measure in MEASURES]
+    values = dict(zip(MEASURES, measures))
+    buckets = time_buckets(record.get(CREATED_Q))
+    for lecturer_id in lecturer_ids:
+        for score_key, question in LECTURE_SCORES.items():
+            scores.add('lecturer', lecturer_id, score_key, record.get(question))
+            if buckets is not None and values[score_key] is not None:
+                trends.add('lecturer', lecturer_id, score_key, buckets, values[score_key])
+
+    # В кубе отзыв учитывается в ячейке каждого лектора-соавтора, а в итоге предмета — один раз
+    cube.add(record['subject_id'],
+             [(lecturer_id, practitioner_id_of(record, lecturer_id)) for lecturer_id in lecturer_ids],
+             measures)
+
+    for practitioner_id in practitioner_ids_of(record):
+        counts = practitioner_lecturers.get(practitioner_id)
+        if counts is None:
+            counts = practitioner_lecturers[practitioner_id] = defaultdict(int)
+        for lecturer_id in lecturer_ids:
+            counts[lecturer_id] += 1
+        for score_key, question in PRACTICE_SCORES.items():
+            scores.add('practitioner', practitioner_id, score_key, record.get(question))
+            if buckets is not None and values[score_key] is not None:
+                trends.add('practitioner', practitioner_id, score_key, buckets, values[score_key])
+
+def lecturer_group(lecturer_id):
+    group = LECTURER_RESPONSES.get(lecturer_id)
+    if group is None:
+        group = LECTURER_RESPONSES[lecturer_id] = ShardedGroup(
+            lambda key: HISTORY.get((key, 'lecturer', lecturer_id)))
+        LECTURERS[NAMES.name(lecturer_id)] = group
+    return group
+
+def practitioner_group(practitioner_id):
+    group = PRACTITIONER_RESPONSES.get(practitioner_id)
+    if group is None:
+        group = PRACTITIONER_RESPONSES[practitioner_id] = ShardedGroup(
+            lambda key: HISTORY.get((key, 'practitioner', practitioner_id)))
+        PRACTITIONERS[NAMES.name(practitioner_id)] = group
+    return group
+
+def add_response(record):
+    """Добавляет ответ текущего семестра в группы лекторов и практиков и во все агрегаты"""
+    for lecturer_id in record['lecturer_ids']:
+        lecturer_group(lecturer_id).append(record)
+    for practitioner_id in practitioner_ids_of(record):
+        practitioner_group(practitioner_id).append(record)
+    accumulate(record, SCORES, CUBE, PRACTITIONER_LECTURERS, TRENDS)
+
+# Версия формата сводок и индексов закрытых семестров: при изменении они пересчитываются
+SUMMARY_VERSION = 5
+
+def summarize_shard(raw, compress_feedback=True):
+    """Сводка семестра по именам (число ответов, гистограммы, куб и ряды), индекс и тексты
+
+    Индекс — номера строк шарда с ответами каждого преподавателя, чтобы
+    странице прошлого семестра разбирать только их. С compress_feedback в
+    нём же положения длинных текстов отзывов каждой строки в сжатых блоках,
+    которые возвращаются третьими.
+    """
+    records = parse_batch(raw)
+    scores, cube, practitioner_lecturers, trends = ScoreIndex(), FeedbackCube(), {}, TrendIndex()
+    lecturers, practitioners = defaultdict(list), defaultdict(list)
+    for line, record in enumerate(records):
+        for lecturer_id in record['lecturer_ids']:
+            lecturers[lecturer_id].append(line)
+        for practitioner_id in practitioner_ids_of(record):
+            practitioners[practitioner_id].append(line)
+        accumulate(record, scores, cube, practitioner_lecturers, trends)
+
+    name = NAMES.name
+    summary = {
+        'responses': len(records),
+        'lecturers': [[name(l), len(lines)] for l, lines in lecturers.items()],
+        'practitioners': [[name(p), len(lines)] for p, lines in practitioners.items()],
+        'practitioner_lecturers': [
+            [name(p), name(l), count] for p, counts in practitioner_lecturers.items() for l, count in counts.items()
+        ],
+        'scores': scores.export(name),
+        'cube': [[SUBJECTS.name(s), name(l), name(p), cell] for (s, l, p), cell in cube.cells.items()],
+        'subjects': [[SUBJECTS.name(s), cell] for s, cell in cube.subjects.items()],
+        'trends': trends.export(name),
+    }
+    index = {
+        'lecturer': [[name(l), lines] for l, lines in lecturers.items()],
+        'practitioner': [[name(p), lines] for p, lines in practitioners.items()],
+    }
+    if not compress_feedback:
+        return summary, index, []
+    feedback = FeedbackStore(FEEDBACK_CACHE)
+    feedback.compress(records, FEEDBACK_QUESTIONS, feedback_group)
+    # По числу на строку и вопрос из FEEDBACK_QUESTIONS; -1 — текст короткий и остался в шарде
+    index['feedback'] = [archive_position(feedback, record.get(question))
+                         for record in records for question in FEEDBACK_QUESTIONS]
+    return summary, index, feedback.blocks
+
+def merge_summary(key, summary):
+    """Добавляет сводку закрытого семестра в агрегаты, не разбирая его ответы"""
+    intern = NAMES.intern
+    for name, count in summary['lecturers']:
+        lecturer_group(intern(name)).add_history(key, count)
+    for name, count in summary['practitioners']:
+        practitioner_group(intern(name)).add_history(key, count)
+    for practitioner, lecturer, count in summary['practitioner_lecturers']:
+        PRACTITIONER_LECTURERS.setdefault(intern(practitioner), defaultdict(int))[intern(lecturer)] += count
+    SCORES.merge_exported(summary['scores'], intern)
+    for subject, lecturer, practitioner, cell in summary['cube']:
+        CUBE.add_cell(SUBJECTS.intern(subject), intern(lecturer), intern(practitioner), cell)
+    for subject, cell in summary['subjects']:
+        CUBE.add_subject_cell(SUBJECTS.intern(subject), cell)
+    TRENDS.merge_exported(summary['trends'], intern)
+
+def load_history_index(key):
+    """Индекс прошлого семестра: ((вид, ID преподавателя) -> номера строк шарда, архив текстов, их положения)"""
+    intern = NAMES.intern
+    source = SHARD_SOURCE
+    index = source.index(key)
+    groups = {
+        (kind, intern(name)): array('I', lines)
+        for kind in ('lecturer', 'practitioner')
+        for name, lines in index[kind]
+    }
+    if 'feedback' not in index:
+        # Тексты не сжимались (шарды в памяти) и разбираются из ответов как есть
+        return groups, None, None
+    archive = FeedbackArchive(FEEDBACK_CACHE, index['blocks'],
+                              lambda offset, length: source.read_block(key, offset, length))
+    return groups, archive, array('q', index['feedback'])
+
+def parse_history(key, lines, entries):
+    """Разбирает ответы из строк lines прошлого семестра
+
+    Тексты отзывов не сжимаются заново: в ответы ставятся ссылки на блоки,
+    сжатые вместе со сводкой семестра.
+    """
+    _, archive, positions = HISTORY_INDEX.get(key)
+    records = parse_batch(entries)
+    if positions is None:
+        return records
+    questions = len(FEEDBACK_QUESTIONS)
+    for line, record in zip(lines, records):
+        for i, question in enumerate(FEEDBACK_QUESTIONS):
+            position = positions[line * questions + i]
+            if position >= 0:
+                record[question] = FeedbackRef(archive, position)
+    return records
 
-# агрегируем
-LECTURERS = group_by('lecturer')
+def load_history_group(group_key):
+    """Ответы одного преподавателя за прошлый семестр; ключ — (семестр, вид, ID)
+
+    Из шарда читаются и разбираются только строки этого преподавателя.
+    """
+    key, kind, teacher_id = group_key
+    lines = HISTORY_INDEX.get(key)[0].get((kind, teacher_id), ())
+    return parse_history(key, lines, SHARD_SOURCE.entries(key, lines))
+
+def all_responses():
+    """Все ответы в хронологическом порядке: прошлые семестры разбираются по одному"""
+    for key in CLOSED_SHARDS:
+        raw = SHARD_SOURCE.raw(key)
+        yield from parse_history(key, range(len(raw)), raw)
+    yield from RESPONSES
+
+
+# Глобальные структуры заполняются на месте, чтобы ссылки, импортированные
+# другими модулями (`from main import LECTURERS`), оставались актуальными
+RESPONSES = []              # разобранные ответы текущего семестра
+NAMES = NameRegistry(NAME_ALIASES)
+SUBJECTS = NameRegistry()
+LECTURER_RESPONSES = {}     # ID лектора -> ответы (ShardedGroup по всем семестрам)
+LECTURERS = {}              # каноническое имя лектора -> те же группы ответов
+PRACTITIONER_RESPONSES = {} # ID практика -> ответы
+PRACTITIONERS = {}          # каноническое имя практика -> те же группы ответов
+PRACTITIONER_LECTURERS = {} # ID практика -> {ID лектора: число ответов}
+SCORES = ScoreIndex()
+CUBE = FeedbackCube()         # (ID предмета, ID лектора, ID практика) -> отзывы и суммы оценок
+TRENDS = TrendIndex()         # ряды средних оценок по неделям и семестрам
+CLOSED_SHARDS = []          # прошлые семестры в хронологическом порядке
+# Индексы небольшие (номера строк и положения текстов) и нужны каждой странице с архивом — не вытесняются
+HISTORY_INDEX = ShardCache(None, load_history_index)
+HISTORY = ShardCache(HISTORY_CACHE_GROUPS, load_history_group)
+SHARD_SOURCE = None
+FEEDBACK_CACHE = BlockCache(FEEDBACK_CACHE_BLOCKS)
+FEEDBACK = FeedbackStore(FEEDBACK_CACHE)  # тексты отзывов текущего семестра
+
+def open_shards(source):
+    """Пересобирает агрегаты: закрытые семестры — из сводок, текущий — из ответов"""
+    global SHARD_SOURCE, FEEDBACK
+    SHARD_SOURCE = source
+    keys = source.keys()
+    NAMES.clear()
+    SUBJECTS.clear()
+    HISTORY_INDEX.clear()
+    HISTORY.clear()
+    LECTURER_RESPONSES.clear()
+    LECTURERS.clear()
+    PRACTITIONER_RESPONSES.clear()
+    PRACTITIONERS.clear()
+    PRACTITIONER_LECTURERS.clear()
+    SCORES.clear()
+    CUBE.clear()
+    TRENDS.clear()
+    # Новое хранилище, а не очистка: потоковые страницы ещё могут читать старые ответы
+    FEEDBACK = FeedbackStore(FEEDBACK_CACHE)
+    FEEDBACK_CACHE.clear()
+
+    CLOSED_SHARDS[:] = keys[:-1]
+    with startup_timer('history_summaries'):
+        for key in CLOSED_SHARDS:
+            merge_summary(key, source.summary(key, summarize_shard, SUMMARY_VERSION))
+
+    with startup_timer('parse_responses'):
+        # Сырые ответы не сохраняются: в памяти остаются только разобранные
+        RESPONSES[:] = parse_responses(source.raw(keys[-1]) if keys else [])
+    with startup_timer('aggregate'):
+        for record in RESPONSES:
+            add_response(record)
+    # Тексты сжимаются уже после запуска, до того ответы держат их строками
+    FEEDBACK.compress_later(RESPONSES, FEEDBACK_QUESTIONS, feedback_group)
+
+def load_dataset(raw):
+    """Парсит сырые ответы и пересобирает все агрегаты (шарды держатся в памяти)"""
+    open_shards(MemoryShards(raw, CREATED_Q))
+
+def load_data():
+    """Загружает DATA_PATH: текущий семестр целиком, прошлые — сводками из SHARDS_DIR"""
+    store = ShardStore(SHARDS_DIR, CREATED_Q)
+    try:
+        with startup_timer('sync_shards'):
+            store.sync(DATA_PATH)
+    except OSError as e:
+        # Например, только для чтения: разбиваем на семестры в памяти
+        print(f"Шарды недоступны ({e}), данные загружаются целиком")
+        load_dataset(load_raw())
+        return
+    open_shards(store)
+
+# загрузка, парсинг и агрегация
+load_data()
 
 @app.route('/')
 def index():
+    start_phase('render')
     return render_template('index.html')
 
+# Сколько фрагментов Jinja склеивать в один кусок потока
+STREAM_BUFFER_SIZE = 64
+
+
+def render_page(template_name, **context):
+    """Рендерит шаблон целиком или потоком (Jinja generate() + stream_with_context)"""
+    if not app.config['STREAM_TEMPLATES']:
+        return render_template(template_name, **context)
+    template = app.jinja_env.get_template(template_name)
+    app.update_template_context(context)
+    stream = template.stream(context)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    return app.response_class(stream_with_context(stream), mimetype='text/html')
+
+
+def review_card(resp, lecturer_ids):
+    """Данные одной карточки отзыва для шаблона; лекторов-соавторов может быть несколько"""
+    # Если практик не указан, используем лектора
+    practitioner_ids = dict.fromkeys(practitioner_id_of(resp, lecturer_id) for lecturer_id in lecturer_ids)
+    return {
+        'id': resp.get('id', '—'),
+        'lecturer': ', '.join(map(NAMES.name, lecturer_ids)),
+        'practitioner': ', '.join(map(NAMES.name, practitioner_ids)),
+        'subject': SUBJECTS.name(resp['subject_id']),
+        'lectures': {
+            'complexity': resp.get(LECTURE_COMPLEXITY_Q, '—'),
+            'interest': resp.get(LECTURE_INTEREST_Q, '—'),
+            'feedback': feedback_text(resp.get(LECTURER_FEEDBACK_Q, '—'))
+        },
+        'practices': {
+            'complexity': resp.get(PRACTICE_COMPLEXITY_Q, '—'),
+            'interest': resp.get(PRACTICE_INTEREST_Q, '—'),
+            'feedback': feedback_text(resp.get(PRACTICE_FEEDBACK_Q, '—'))
+        }
+    }
+
+
+def review_cards(pairs):
+    """Карточки по парам (ID лекторов, ответ) — по одной, без списка словарей"""
+    for lecturer_ids, resp in pairs:
+        yield review_card(resp, lecturer_ids)
+
+
 @app.route('/reviews')
 def reviews():
-    # Собираем все отзывы с дополнительной информацией
-    all_reviews = []
-    
-    for lecturer_name, responses in LECTURERS.items():
+    start_phase('prep')
+    # Пары (лекторы, ответ) по предметам в порядке предметов из куба;
+    # карточки строятся из них уже во время рендеринга
+    pairs_by_subject = {subject_id: [] for (subject_id,) in CUBE.rollup('subject')}
+    # Один проход по семестрам, чтобы не подгружать архив заново для каждого лектора.
+    # Ответ с лекторами-соавторами — одна карточка, учтённая в группе первого из них
+    by_lecturer = {lecturer_id: [] for lecturer_id in LECTURER_RESPONSES}
+    for resp in all_responses():
+        by_lecturer[resp['lecturer_ids'][0]].append(resp)
+    for responses in by_lecturer.values():
         for resp in responses:
-            # Данные о лекциях
-            lecture_complexity = resp.get(LECTURE_COMPLEXITY_Q, '—')
-            lecture_interest = resp.get(LECTURE_INTEREST_Q, '—')
-            lecture_feedback = resp.get(LECTURER_FEEDBACK_Q, '—')
-            
-            # Данные о практиках
-            practice_complexity = resp.get(PRACTICE_COMPLEXITY_Q, '—')
-            practice_interest = resp.get(PRACTICE_INTEREST_Q, '—')
-            practice_feedback = resp.get(PRACTICE_FEEDBACK_Q, '—')
-            practitioner = resp.get(PRACTITIONER_Q, '—')
-            
-            # Если практик не указан, используем имя лектора
-            if not practitioner or practitioner == '—' or practitioner.strip() == '':
-                practitioner = lecturer_name
-            
-            all_reviews.append({
-                'id': resp.get('id', '—'),
-                'lecturer': lecturer_name,
-                'practitioner': practitioner,
-                'subject': resp.get('subject', '—'),
-                'lectures': {
-                    'complexity': lecture_complexity,
-                    'interest': lecture_interest,
-                    'feedback': lecture_feedback
-                },
-                'practices': {
-                    'complexity': practice_complexity,
-                    'interest': practice_interest,
-                    'feedback': practice_feedback
-                }
-            })
-    
-    # Группируем отзывы по предметам для отображения
-    reviews_by_subject = defaultdict(list)
-    for review in all_reviews:
-        subject = review['subject']
-        reviews_by_subject[subject].append(review)
+            pairs_by_subject[resp['subject_id']].append((resp['lecturer_ids'], resp))
     
     # Сортируем отзывы внутри каждого предмета по ID
-    for subject in reviews_by_subject:
-        reviews_by_subject[subject].sort(key=lambda x: int(x['id']) if x['id'].isdigit() else 0)
+    for pairs in pairs_by_subject.values():
+        pairs.sort(key=lambda pair: int(pair[1]['id']) if pair[1].get('id', '—').isdigit() else 0)
     
-    # Собираем уникальных лекторов и их практиков для фильтров
-    lecturers_with_practitioners = {}
-    for review in all_reviews:
-        lecturer = review['lecturer']
-        practitioner = review['practitioner']
-        
-        if lecturer not in lecturers_with_practitioners:
-            lecturers_with_practitioners[lecturer] = set()
-        lecturers_with_practitioners[lecturer].add(practitioner)
+    reviews_by_subject = {
+        SUBJECTS.name(subject_id): review_cards(pairs)
+        for subject_id, pairs in pairs_by_subject.items()
+    }
+    
+    def filter_index():
+        # Битовые маски для фильтров в порядке карточек на странице;
+        # выводятся после карточек, поэтому считаются в конце потока.
+        # Карточка соавторов попадает в маски каждого из них и их практиков
+        return build_filter_index([
+            ([NAMES.name(lecturer_id) for lecturer_id in lecturer_ids],
+             [NAMES.name(practitioner_id_of(resp, lecturer_id)) for lecturer_id in lecturer_ids],
+             [SUBJECTS.name(subject_id)])
+            for subject_id, pairs in pairs_by_subject.items()
+            for lecturer_ids, resp in pairs
+        ])
+    
+    filter_data, teacher_stats, subjects_with_teachers = filter_sidebar()
+    
+    start_phase('render')
+    return render_page('reviews.html', 
+                       reviews_by_subject=reviews_by_subject,
+                       review_count=sum(map(len, pairs_by_subject.values())),
+                       filter_index=filter_index,
+                       filter_data=filter_data,
+                       teacher_stats=teacher_stats,
+                       subjects_with_teachers=subjects_with_teachers)
+
+
+def filter_sidebar():
+    """Данные для фильтров страницы отзывов: строятся из куба и гистограмм за O(ячеек)"""
+    # Практики каждого лектора
+    practitioner_ids = defaultdict(list)
+    for lecturer_id, practitioner_id in CUBE.rollup('lecturer', 'practitioner'):
+        practitioner_ids[lecturer_id].append(practitioner_id)
+    practitioner_names = {
+        lecturer_id: sorted(NAMES.name(p) for p in ids)
+        for lecturer_id, ids in practitioner_ids.items()
+    }
     
     # Преобразуем в удобный формат для шаблона
     filter_data = []
-    for lecturer, practitioners in sorted(lecturers_with_practitioners.items()):
+    for lecturer_id in sorted(practitioner_names, key=NAMES.name):
         filter_data.append({
-            'lecturer': lecturer,
-            'practitioners': sorted(practitioners)
+            'lecturer': NAMES.name(lecturer_id),
+            'practitioners': practitioner_names[lecturer_id]
         })
     
     # Собираем статистику по преподавателям (лекторам и практикам)
+    # из заранее посчитанных гистограмм оценок
     teacher_stats = {}
     
     # Статистика по лекторам (по лекциям)
-    for lecturer_name, responses in LECTURERS.items():
-        complexity_total, complexity_cnt = 0.0, 0
-        interest_total, interest_cnt = 0.0, 0
-        
-        for r in responses:
-            # Сложность лекций
-            raw_complexity = r.get(LECTURE_COMPLEXITY_Q)
-            try:
-                num = float(raw_complexity)
-                complexity_total += num
-                complexity_cnt += 1
-            except (TypeError, ValueError):
-                pass
-                
-            # Интерес лекций
-            raw_interest = r.get(LECTURE_INTEREST_Q)
-            try:
-                num = float(raw_interest)
-                interest_total += num
-                interest_cnt += 1
-            except (TypeError, ValueError):
-                pass
-        
-        complexity_avg = round(complexity_total / complexity_cnt, 1) if complexity_cnt else None
-        interest_avg = round(interest_total / interest_cnt, 1) if interest_cnt else None
-        
-        teacher_stats[lecturer_name] = {
-            'complexity': complexity_avg,
-            'interest': interest_avg,
+    for lecturer_id in LECTURER_RESPONSES:
+        teacher_stats[NAMES.name(lecturer_id)] = {
+            'complexity': SCORES.mean('lecturer', lecturer_id, 'lecture_complexity', 1),
+            'interest': SCORES.mean('lecturer', lecturer_id, 'lecture_interest', 1),
             'type': 'lecturer'
         }
     
     # Статистика по практикам (по практикам)
-    practitioner_stats = {}
-    for review in all_reviews:
-        practitioner = review['practitioner']
-        
-        if practitioner not in practitioner_stats:
-            practitioner_stats[practitioner] = {
-                'complexity_total': 0.0,
-                'complexity_cnt': 0,
-                'interest_total': 0.0,
-                'interest_cnt': 0
-            }
-        
-        # Сложность практик
-        if review['practices']['complexity'] != '—':
-            try:
-                num = float(review['practices']['complexity'])
-                practitioner_stats[practitioner]['complexity_total'] += num
-                practitioner_stats[practitioner]['complexity_cnt'] += 1
-            except (TypeError, ValueError):
-                pass
-        
-        # Интерес практик
-        if review['practices']['interest'] != '—':
-            try:
-                num = float(review['practices']['interest'])
-                practitioner_stats[practitioner]['interest_total'] += num
-                practitioner_stats[practitioner]['interest_cnt'] += 1
-            except (TypeError, ValueError):
-                pass
-    
-    # Вычисляем средние для практиков
-    for practitioner, stats in practitioner_stats.items():
-        complexity_avg = round(stats['complexity_total'] / stats['complexity_cnt'], 1) if stats['complexity_cnt'] else None
-        interest_avg = round(stats['interest_total'] / stats['interest_cnt'], 1) if stats['interest_cnt'] else None
+    for practitioner_id in SCORES.names('practitioner'):
+        practitioner = NAMES.name(practitioner_id)
+        complexity_avg = SCORES.mean('practitioner', practitioner_id, 'practice_complexity', 1)
+        interest_avg = SCORES.mean('practitioner', practitioner_id, 'practice_interest', 1)
         
         # Если практик не является лектором, добавляем его в teacher_stats
         if practitioner not in teacher_stats:
@@ -260,73 +566,17 @@ def reviews():
             teacher_stats[practitioner]['practice_complexity'] = complexity_avg
             teacher_stats[practitioner]['practice_interest'] = interest_avg
     
-    # Статистика по практикам
-    practitioners_data = defaultdict(list)
-    for review in all_reviews:
-        practitioner = review['practitioner']
-        if practitioner != review['lecturer']:  # Только если практик отличается от лектора
-            practitioners_data[practitioner].append(review)
-    
-    for practitioner_name, reviews in practitioners_data.items():
-        complexity_total, complexity_cnt = 0.0, 0
-        interest_total, interest_cnt = 0.0, 0
-        
-        for review in reviews:
-            # Сложность практик
-            try:
-                if review['practices']['complexity'] != '—':
-                    num = float(review['practices']['complexity'])
-                    complexity_total += num
-                    complexity_cnt += 1
-            except (TypeError, ValueError):
-                pass
-                
-            # Интерес практик
-            try:
-                if review['practices']['interest'] != '—':
-                    num = float(review['practices']['interest'])
-                    interest_total += num
-                    interest_cnt += 1
-            except (TypeError, ValueError):
-                pass
-        
-        complexity_avg = round(complexity_total / complexity_cnt, 1) if complexity_cnt else None
-        interest_avg = round(interest_total / interest_cnt, 1) if interest_cnt else None
-        
-        if practitioner_name not in teacher_stats:
-            teacher_stats[practitioner_name] = {
-                'complexity': complexity_avg,
-                'interest': interest_avg,
-                'type': 'practitioner'
-            }
-    
     # Группируем преподавателей по предметам для фильтров
     subjects_with_teachers = {}
-    for review in all_reviews:
-        subject = review['subject']
-        lecturer = review['lecturer']
-        
-        if subject not in subjects_with_teachers:
-            subjects_with_teachers[subject] = {}
-        
-        if lecturer not in subjects_with_teachers[subject]:
-            # Находим всех практиков для этого лектора
-            practitioners = set()
-            for r in all_reviews:
-                if r['lecturer'] == lecturer:
-                    practitioners.add(r['practitioner'])
-            
-            subjects_with_teachers[subject][lecturer] = {
-                'practitioners': sorted(practitioners),
-                'stats': teacher_stats.get(lecturer, {})
-            }
+    for subject_id, lecturer_id in CUBE.rollup('subject', 'lecturer'):
+        subject = SUBJECTS.name(subject_id)
+        lecturer = NAMES.name(lecturer_id)
+        subjects_with_teachers.setdefault(subject, {})[lecturer] = {
+            'practitioners': practitioner_names[lecturer_id],
+            'stats': teacher_stats.get(lecturer, {})
+        }
     
-    return render_template('reviews.html', 
-                         reviews_by_subject=dict(reviews_by_subject),
-                         filter_data=filter_data,
-                         teacher_stats=teacher_stats,
-                         subjects_with_teachers=subjects_with_teachers)
-
+    return filter_data, teacher_stats, subjects_with_teachers
 
 
 def invert_score(val: float) -> float:
@@ -334,41 +584,22 @@ def invert_score(val: float) -> float:
 
 @app.route('/lecturers')
 def lecturers():
+    start_phase('prep')
+    # Предметы каждого лектора из куба
+    lecturer_subjects = defaultdict(set)
+    for lecturer_id, subject_id in CUBE.rollup('lecturer', 'subject'):
+        subject = SUBJECTS.name(subject_id)
+        if subject and subject != '—':
+            lecturer_subjects[lecturer_id].add(subject)
+    
     stats = []
-    for name, responses in LECTURERS.items():
-        # Считаем сложность лекций (инвертируем)
-        complexity_total, complexity_cnt = 0.0, 0
-        # Считаем интерес лекций (не инвертируем)
-        interest_total, interest_cnt = 0.0, 0
-        
-        # Собираем предметы лектора
-        subjects = set()
-        
-        for r in responses:
-            subject = r.get('subject', '')
-            if subject and subject != '—':
-                subjects.add(subject)
-                
-            # Сложность лекций
-            raw_complexity = r.get(LECTURE_COMPLEXITY_Q)
-            try:
-                num = float(raw_complexity)
-                complexity_total += num  # НЕ инвертируем для сложности
-                complexity_cnt += 1
-            except (TypeError, ValueError):
-                pass
-                
-            # Интерес лекций
-            raw_interest = r.get(LECTURE_INTEREST_Q)
-            try:
-                num = float(raw_interest)
-                interest_total += num  # не инвертируем для интереса
-                interest_cnt += 1
-            except (TypeError, ValueError):
-                pass
+    for lecturer_id, responses in LECTURER_RESPONSES.items():
+        name = NAMES.name(lecturer_id)
+        subjects = lecturer_subjects[lecturer_id]
         
-        complexity_avg = round(complexity_total / complexity_cnt, 2) if complexity_cnt else None
-        interest_avg = round(interest_total / interest_cnt, 2) if interest_cnt else None
+        # Средние берём из гистограмм (сложность НЕ инвертируем)
+        complexity_avg = SCORES.mean('lecturer', lecturer_id, 'lecture_complexity', 2)
+        interest_avg = SCORES.mean('lecturer', lecturer_id, 'lecture_interest', 2)
         
         # Создаем краткие названия предметов используя словарь
         subject_shorts = []
@@ -388,58 +619,170 @@ def lecturers():
             'subjects': subject_short
         })
     
+    start_phase('render')
     return render_template('lecturers.html', lecturers=stats)
 
 
-@app.route('/lecturers/<name>')
+def trend_series(kind, key, score_keys):
+    """Ряды средних по семестрам и неделям для графиков на странице преподавателя"""
+    return {
+        score_key: {granularity: TRENDS.points(kind, key, score_key, granularity) for granularity in GRANULARITIES}
+        for score_key in score_keys
+    }
+
+
+# Имена — свободный текст формы и могут содержать '/', поэтому path
+@app.route('/lecturers/<path:name>')
 def lecturer_detail(name):
-    if name not in LECTURERS:
+    # Имя из URL сравнивается по нормализованному ключу
+    lecturer_id = NAMES.lookup(name)
+    if lecturer_id not in LECTURER_RESPONSES:
         abort(404)
-    responses = LECTURERS[name]
+    start_phase('prep')
+    name = NAMES.name(lecturer_id)
+    responses = LECTURER_RESPONSES[lecturer_id]
     
-    # Собираем уникальных практиков для фильтра
-    practitioners = set()
-    for r in responses:
-        practitioner = r.get(PRACTITIONER_Q, '').strip()
-        if practitioner and practitioner != '—' and practitioner != '':
-            practitioners.add(practitioner)
+    # Практики для фильтра — из куба, без обхода ответов; как и на карточках,
+    # если практик не указан, практики вёл сам лектор
+    practitioner_ids = {p for l, p in CUBE.rollup('lecturer', 'practitioner') if l == lecturer_id}
     
-    # Подготавливаем структурированные данные для отображения
-    structured_responses = []
-    for r in responses:
-        # Данные о лекциях
-        lecture_complexity = r.get(LECTURE_COMPLEXITY_Q, '—')
-        lecture_interest = r.get(LECTURE_INTEREST_Q, '—')
-        lecture_feedback = r.get(LECTURER_FEEDBACK_Q, '—')
-        
-        # Данные о практиках
-        practice_complexity = r.get(PRACTICE_COMPLEXITY_Q, '—')
-        practice_interest = r.get(PRACTICE_INTEREST_Q, '—')
-        practice_feedback = r.get(PRACTICE_FEEDBACK_Q, '—')
-        practitioner = r.get(PRACTITIONER_Q, '—')
-        # Если практик не указан, используем имя лектора
-        if not practitioner or practitioner == '—' or practitioner.strip() == '':
-            practitioner = name
+    start_phase('render')
+    return render_page('lecturer_detail.html',
+                       name=name,
+                       responses=review_cards(((lecturer_id,), r) for r in responses),
+                       review_count=len(responses),
+                       practitioners=sorted(NAMES.name(p) for p in practitioner_ids),
+                       distributions=SCORES.summary('lecturer', lecturer_id),
+                       trends=trend_series('lecturer', lecturer_id, LECTURE_SCORES),
+                       practitioner_distributions={
+                           NAMES.name(p): SCORES.summary('practitioner', p) for p in practitioner_ids
+                       })
+
+
+@app.route('/practitioners')
+def practitioners():
+    start_phase('prep')
+    stats = []
+    for practitioner_id, responses in PRACTITIONER_RESPONSES.items():
+        # Лекторы, с которыми работал практик, — по убыванию числа отзывов
+        lecturer_counts = PRACTITIONER_LECTURERS[practitioner_id]
+        lecturer_names = [NAMES.name(l) for l in sorted(lecturer_counts, key=lecturer_counts.get, reverse=True)]
         
+        stats.append({
+            'name': NAMES.name(practitioner_id),
+            'complexity_avg': SCORES.mean('practitioner', practitioner_id, 'practice_complexity', 2),
+            'interest_avg': SCORES.mean('practitioner', practitioner_id, 'practice_interest', 2),
+            'reviews': len(responses),
+            'lecturers': ', '.join(lecturer_names)
+        })
+    
+    start_phase('render')
+    return render_template('practitioners.html', practitioners=stats)
+
+
+@app.route('/practitioners/<path:name>')
+def practitioner_detail(name):
+    practitioner_id = NAMES.lookup(name)
+    if practitioner_id not in PRACTITIONER_RESPONSES:
+        abort(404)
+    start_phase('prep')
+    name = NAMES.name(practitioner_id)
+    
+    structured_responses = []
+    for r in PRACTITIONER_RESPONSES[practitioner_id]:
         structured_responses.append({
             'id': r.get('id', '—'),
-            'practitioner': practitioner,
-            'lectures': {
-                'complexity': lecture_complexity,
-                'interest': lecture_interest,
-                'feedback': lecture_feedback
-            },
+            'lecturer': ', '.join(NAMES.name(l) for l in r['lecturer_ids']),
+            'subject': r.get('subject', '—'),
             'practices': {
-                'complexity': practice_complexity,
-                'interest': practice_interest,
-                'feedback': practice_feedback
+                'complexity': r.get(PRACTICE_COMPLEXITY_Q, '—'),
+                'interest': r.get(PRACTICE_INTEREST_Q, '—'),
+                'feedback': feedback_text(r.get(PRACTICE_FEEDBACK_Q, '—'))
             }
         })
     
-    return render_template('lecturer_detail.html',
+    start_phase('render')
+    return render_template('practitioner_detail.html',
                            name=name,
                            responses=structured_responses,
-                           practitioners=sorted(practitioners))
+                           lecturers=sorted(NAMES.name(l) for l in PRACTITIONER_LECTURERS[practitioner_id]),
+                           distributions=SCORES.summary('practitioner', practitioner_id),
+                           trends=trend_series('practitioner', practitioner_id, PRACTICE_SCORES))
+
+
+def subject_names():
+    """Названия всех предметов, по которым есть отзывы"""
+    return [SUBJECTS.name(subject_id) for (subject_id,) in CUBE.rollup('subject')]
+
+
+def cube_scores(cell, digits=2):
+    """Средние оценки и число отзывов из ячейки куба"""
+    scores = {measure: cell_mean(cell, measure, digits) for measure in MEASURES}
+    scores['reviews'] = cell_count(cell)
+    return scores
+
+
+@app.route('/subjects')
+def subjects():
+    start_phase('prep')
+    # Число лекторов по каждому предмету
+    lecturer_counts = defaultdict(int)
+    for subject_id, _ in CUBE.rollup('subject', 'lecturer'):
+        lecturer_counts[subject_id] += 1
+    
+    stats = []
+    # Итоги предметов — по отзывам: отзыв соавторов считается один раз
+    for subject_id, cell in CUBE.subjects.items():
+        subject = SUBJECTS.name(subject_id)
+        stats.append({
+            'name': subject,
+            'short_name': SUBJECT_SHORT_NAMES.get(subject, subject),
+            'lecturers': lecturer_counts[subject_id],
+            **cube_scores(cell)
+        })
+    
+    start_phase('render')
+    return render_template('subjects.html', subjects=stats)
+
+
+@app.route('/subjects/<path:name>')
+def subject_detail(name):
+    subject_id = SUBJECTS.lookup(name)
+    if (subject_id,) not in CUBE.rollup('subject'):
+        abort(404)
+    start_phase('prep')
+    name = SUBJECTS.name(subject_id)
+    
+    # Лекторы предмета и их практики — из ячеек куба
+    lecturers = {}
+    for (cell_subject_id, lecturer_id), cell in CUBE.rollup('subject', 'lecturer').items():
+        if cell_subject_id == subject_id:
+            lecturers[lecturer_id] = {
+                'name': NAMES.name(lecturer_id),
+                'practitioners': [],
+                **cube_scores(cell)
+            }
+    for (cell_subject_id, lecturer_id, practitioner_id), cell in CUBE.cells.items():
+        if cell_subject_id == subject_id:
+            lecturers[lecturer_id]['practitioners'].append({
+                'name': NAMES.name(practitioner_id),
+                **cube_scores(cell)
+            })
+    for lecturer in lecturers.values():
+        lecturer['practitioners'].sort(key=lambda p: p['name'])
+    
+    start_phase('render')
+    return render_template('subject_detail.html',
+                           name=name,
+                           summary=cube_scores(CUBE.subjects[subject_id]),
+                           lecturers=sorted(lecturers.values(), key=lambda l: l['name']))
+
+
+@app.route('/stats.json')
+def stats_json():
+    """Распределения оценок по всем лекторам и практикам"""
+    start_phase('render')
+    return jsonify(SCORES.as_dict(NAMES.name))
 
 if __name__ == '__main__':
     # Для разработки
@@ -0,0 +1,83 @@
+"""
+Нормализация и интернирование имён преподавателей
+
+Ответы из формы — свободный текст, поэтому «Пригодич Никита Дмитриевич»,
+«пригодич  никита дмитриевич» и «Пригодич Никита Дмитриевич » должны
+попадать в одну группу. Каждое имя приводится к ключу (пробелы, регистр,
+ё/е, таблица алиасов) и получает целочисленный ID; дальше все группировки
+идут по ID, а для отображения хранится каноническое написание.
+"""
+
+import re
+
+# Разделители соавторов в одном ответе: «Васильев А. В., Белоусов А. С.»
+_SEPARATORS = re.compile(r'[,;]')
+
+
+def normalize_name(name):
+    """Ключ для сравнения имён: без лишних пробелов, регистра и различия ё/е"""
+    return ' '.join(name.replace('ё', 'е').replace('Ё', 'Е').split()).casefold()
+
+
+class NameRegistry:
+    """Отображение имён в целочисленные ID и обратно"""
+
+    def __init__(self, aliases=None):
+        self._aliases = {}
+        self._ids = {}              # нормализованный ключ -> ID
+        self._names = []            # ID -> каноническое написание
+        self._cache = {}            # сырая строка -> ID, чтобы не нормализовать повторно
+        self._many_cache = {}       # сырая строка -> кортеж ID соавторов
+        if aliases:
+            self.set_aliases(aliases)
+
+    def set_aliases(self, aliases):
+        """Таблица алиасов {вариант написания: каноническое имя}"""
+        self._aliases = {normalize_name(variant): canonical for variant, canonical in aliases.items()}
+        self.clear()
+
+    def clear(self):
+        self._ids.clear()
+        self._names.clear()
+        self._cache.clear()
+        self._many_cache.clear()
+
+    def __len__(self):
+        return len(self._names)
+
+    def _resolve(self, name):
+        key = normalize_name(name)
+        canonical = self._aliases.get(key)
+        if canonical is not None:
+            return normalize_name(canonical), ' '.join(canonical.split())
+        return key, ' '.join(name.split())
+
+    def intern(self, name):
+        """Возвращает ID имени, заводя новый при первом появлении"""
+        name_id = self._cache.get(name)
+        if name_id is None:
+            key, display = self._resolve(name)
+            name_id = self._ids.get(key)
+            if name_id is None:
+                name_id = self._ids[key] = len(self._names)
+                self._names.append(display)
+            self._cache[name] = name_id
+        return name_id
+
+    def intern_many(self, names):
+        """ID всех соавторов из строки через запятую (пустые части пропускаются)"""
+        ids = self._many_cache.get(names)
+        if ids is None:
+            ids = tuple(self.intern(part) for part in _SEPARATORS.split(names) if part.strip())
+            self._many_cache[names] = ids
+        return ids
+
+    def lookup(self, name):
+        """ID уже известного имени или None"""
+        name_id = self._cache.get(name)
+        if name_id is None:
+            name_id = self._ids.get(self._resolve(name)[0])
+        return name_id
+
+    def name(self, name_id):
+        return self._names[name_id]
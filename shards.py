@@ -0,0 +1,307 @@
+"""
+Разбиение ответов на семестры по времени создания
+
+Файл с данными делится на шарды по семестрам ('2025-spring', '2025-autumn'),
+которые лежат отдельными файлами (по ответу в строке) рядом со сводкой.
+Текущий (последний) семестр загружается целиком, а по закрытым при старте
+читаются только сводки — агрегаты, посчитанные один раз после закрытия
+семестра и больше не меняющиеся. Вместе со сводкой пишется индекс: номера
+строк ответов каждого преподавателя. Странице преподавателя из прошлых
+семестров читаются и разбираются только его строки, а разобранные группы
+(семестр, преподаватель) держатся в ограниченном LRU. Тексты отзывов закрытого
+семестра сжимаются тоже один раз, вместе со сводкой, и лежат рядом блоками
+(<семестр>.feedback), которые читаются по смещениям из индекса.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from array import array
+from collections import OrderedDict
+
+UNDATED = 'undated'
+# Формат файлов шардов: 2 — по ответу в строке (JSON Lines), чтобы читать строки по смещениям
+SHARD_FORMAT = 2
+
+
+def semester_of(created):
+    """'2025-07-11 20:22:49' -> '2025-spring'; январь относится к осени прошлого года"""
+    try:
+        year, month = int(created[:4]), int(created[5:7])
+    except (TypeError, ValueError):
+        return UNDATED
+    if month == 1:
+        return f'{year - 1}-autumn'
+    return f'{year}-spring' if month <= 8 else f'{year}-autumn'
+
+
+def semester_sort_key(key):
+    """Хронологический порядок семестров; ответы без даты — самые старые"""
+    if key == UNDATED:
+        return (0, 0)
+    year, season = key.split('-')
+    return (int(year), 1 if season == 'spring' else 2)
+
+
+def partition(raw, created_q):
+    """Сырые ответы -> {семестр: ответы} в хронологическом порядке семестров"""
+    shards = {}
+    for entry in raw:
+        created = next((answer for question, answer in entry if question == created_q), None)
+        shards.setdefault(semester_of(created), []).append(entry)
+    return OrderedDict((key, shards[key]) for key in sorted(shards, key=semester_sort_key))
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _tmp_path(path):
+    # Воркеры gunicorn синхронизируют шарды одновременно — у каждого свой временный файл
+    return f'{path}.{os.getpid()}.tmp'
+
+
+def _write_json(path, value):
+    tmp = _tmp_path(path)
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _json_lines(entries):
+    return b''.join(json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n' for entry in entries)
+
+
+def _pack_blocks(blocks, index):
+    """Склеивает сжатые блоки текстов в один файл; их (смещение, длина) — в index['blocks']"""
+    index['blocks'], offset = [], 0
+    for block in blocks:
+        index['blocks'].append([offset, len(block)])
+        offset += len(block)
+    return b''.join(blocks)
+
+
+class MemoryShards:
+    """Шарды из уже загруженного списка ответов (бенчмарки, load_dataset)"""
+
+    def __init__(self, raw, created_q):
+        self._shards = partition(raw, created_q)
+        self._summaries = {}
+        self._indexes = {}
+
+    def keys(self):
+        return list(self._shards)
+
+    def raw(self, key):
+        return self._shards[key]
+
+    def entries(self, key, lines):
+        entries = self._shards[key]
+        return [entries[line] for line in lines]
+
+    def summary(self, key, summarize, version=1):
+        if key not in self._summaries:
+            # Сырые ответы и так в памяти — тексты отзывов берутся из них, а не сжимаются
+            self._summaries[key], self._indexes[key], _ = summarize(self.raw(key), False)
+        return self._summaries[key]
+
+    def index(self, key):
+        return self._indexes[key]
+
+
+class ShardStore:
+    """Шарды на диске: <семестр>.jsonl, .summary.json, .index.json, .feedback и manifest.json"""
+
+    def __init__(self, directory, created_q):
+        self.directory = directory
+        self.created_q = created_q
+        self._manifest = None
+        self._line_offsets = {}         # семестр -> смещения строк в файле шарда
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path('manifest.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def sync(self, data_path):
+        """Переразбивает файл с данными, если он изменился; неизменные шарды не трогает"""
+        manifest = self._read_manifest()
+        stat = os.stat(data_path)
+        source = manifest.get('source', {})
+        self._line_offsets.clear()
+        if manifest.get('format') == SHARD_FORMAT and \
+                source.get('size') == stat.st_size and source.get('mtime_ns') == stat.st_mtime_ns:
+            self._manifest = manifest
+            return False
+
+        with open(data_path, 'rb') as f:
+            content = f.read()
+        digest = _digest(content)
+        os.makedirs(self.directory, exist_ok=True)
+        if source.get('sha256') != digest or manifest.get('format') != SHARD_FORMAT:
+            shards = {}
+            for key, entries in partition(json.loads(content), self.created_q).items():
+                data = _json_lines(entries)
+                shard_digest = _digest(data)
+                path = self._path(f'{key}.jsonl')
+                if manifest.get('shards', {}).get(key, {}).get('sha256') != shard_digest or not os.path.exists(path):
+                    tmp = _tmp_path(path)
+                    with open(tmp, 'wb') as f:
+                        f.write(data)
+                    os.replace(tmp, path)
+                shards[key] = {'count': len(entries), 'sha256': shard_digest}
+
+            for key in set(manifest.get('shards', {})) - set(shards):
+                for name in (f'{key}.json', f'{key}.jsonl', f'{key}.summary.json', f'{key}.index.json',
+                             f'{key}.feedback'):
+                    if os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+            if manifest.get('format') != SHARD_FORMAT:
+                # Шарды прошлого формата (<семестр>.json) больше не читаются
+                for key in shards:
+                    if os.path.exists(self._path(f'{key}.json')):
+                        os.remove(self._path(f'{key}.json'))
+            manifest['shards'] = shards
+            manifest['format'] = SHARD_FORMAT
+
+        manifest['source'] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest}
+        _write_json(self._path('manifest.json'), manifest)
+        self._manifest = manifest
+        return True
+
+    def keys(self):
+        return list((self._manifest or self._read_manifest()).get('shards', {}))
+
+    def raw(self, key):
+        with open(self._path(f'{key}.jsonl'), encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    def _offsets(self, key):
+        offsets = self._line_offsets.get(key)
+        if offsets is None:
+            offsets, position = array('q'), 0
+            with open(self._path(f'{key}.jsonl'), 'rb') as f:
+                for line in f:
+                    offsets.append(position)
+                    position += len(line)
+            self._line_offsets[key] = offsets
+        return offsets
+
+    def entries(self, key, lines):
+        """Ответы из указанных строк шарда; остальные строки не читаются"""
+        offsets = self._offsets(key)
+        with open(self._path(f'{key}.jsonl'), 'rb') as f:
+            entries = []
+            for line in lines:
+                f.seek(offsets[line])
+                entries.append(json.loads(f.readline()))
+            return entries
+
+    def summary(self, key, summarize, version=1):
+        """Сводка закрытого семестра: считается один раз и дальше только читается
+
+        summarize(ответы, сжимать ли тексты) возвращает сводку, индекс семестра
+        и сжатые блоки текстов отзывов. Они пересчитываются, лишь если
+        изменилось содержимое самого шарда или формат сводки (version).
+        """
+        shard_digest = (self._manifest or self._read_manifest())['shards'][key]['sha256']
+        path = self._path(f'{key}.summary.json')
+        try:
+            with open(path, encoding='utf-8') as f:
+                summary = json.load(f)
+            if summary.get('shard_sha256') == shard_digest and summary.get('version', 1) == version \
+                    and os.path.exists(self._path(f'{key}.index.json')) \
+                    and os.path.exists(self._path(f'{key}.feedback')):
+                return summary
+        except (OSError, ValueError):
+            pass
+
+        summary, index, blocks = summarize(self.raw(key), True)
+        # Тексты и индекс пишутся первыми: сводка с верным хэшем означает, что они тоже актуальны
+        feedback_path = self._path(f'{key}.feedback')
+        tmp = _tmp_path(feedback_path)
+        with open(tmp, 'wb') as f:
+            f.write(_pack_blocks(blocks, index))
+        os.replace(tmp, feedback_path)
+        _write_json(self._path(f'{key}.index.json'), index)
+        summary['shard_sha256'] = shard_digest
+        summary['version'] = version
+        _write_json(path, summary)
+        return summary
+
+    def index(self, key):
+        with open(self._path(f'{key}.index.json'), encoding='utf-8') as f:
+            return json.load(f)
+
+    def read_block(self, key, offset, length):
+        """Сжатый блок текстов отзывов из <семестр>.feedback"""
+        with open(self._path(f'{key}.feedback'), 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+
+
+class ShardCache:
+    """LRU загруженных данных прошлых семестров; capacity=None — без вытеснения
+
+    Потокобезопасен (gunicorn --threads); загрузка идёт вне блокировки, так что
+    два потока могут изредка загрузить один ключ дважды.
+    """
+
+    def __init__(self, capacity, loader):
+        self.capacity = capacity
+        self._loader = loader
+        self._shards = OrderedDict()
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._shards.clear()
+
+    def get(self, key):
+        with self._lock:
+            shard = self._shards.get(key)
+            if shard is not None:
+                self._shards.move_to_end(key)
+                return shard
+        shard = self._loader(key)
+        with self._lock:
+            self._shards[key] = shard
+            while self.capacity is not None and len(self._shards) > self.capacity:
+                self._shards.popitem(last=False)
+        return shard
+
+
+class ShardedGroup:
+    """Ответы одного преподавателя: прошлые семестры — счётчиками, текущий — списком
+
+    len() не загружает архив; при обходе ответы прошлых семестров берутся
+    через load(семестр) в хронологическом порядке, затем текущие. load
+    возвращает только ответы этого преподавателя за семестр.
+    """
+
+    __slots__ = ('history', 'current', '_load')
+
+    def __init__(self, load):
+        self.history = {}           # семестр -> число ответов
+        self.current = []
+        self._load = load
+
+    def add_history(self, key, count):
+        self.history[key] = self.history.get(key, 0) + count
+
+    def append(self, record):
+        self.current.append(record)
+
+    def __len__(self):
+        return sum(self.history.values()) + len(self.current)
+
+    def __iter__(self):
+        for key in self.history:
+            yield from self._load(key)
+        yield from self.current
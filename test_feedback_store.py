@@ -0,0 +1,24 @@
+from feedback_store import BLOCK_SIZE, BlockCache, FeedbackRef, FeedbackStore, feedback_text
+
+
+def test_text_longer_than_block():
+    store = FeedbackStore(BlockCache(4))
+    long_text = 'я' * (BLOCK_SIZE + 1000)
+    short_text = 'отзыв ' * 20
+    refs = [store.put(long_text, (1, 2)), store.put(short_text, (1, 2)), store.put(long_text, (1, 2))]
+    assert all(isinstance(ref, FeedbackRef) for ref in refs)
+    expected = [long_text, short_text, long_text]
+    assert [feedback_text(ref) for ref in refs] == expected
+    store.seal()
+    assert store.stats()['pending_chars'] == 0
+    assert [feedback_text(ref) for ref in refs] == expected
+
+
+def test_compress_replaces_long_texts_with_refs():
+    store = FeedbackStore(BlockCache(4))
+    records = [{'group': i % 2, 'text': f'{i} ' + 'отзыв ' * 20, 'other': 'коротко'} for i in range(10)]
+    expected = [dict(record) for record in records]
+    store.compress(records, ('text', 'other'), lambda record: record['group'])
+    assert all(isinstance(record['text'], FeedbackRef) for record in records)
+    assert all(record['other'] == 'коротко' for record in records)
+    assert [feedback_text(r['text']) for r in records] == [e['text'] for e in expected]
@@ -0,0 +1,119 @@
+"""
+Динамика оценок преподавателей во времени
+
+Для каждой пары (преподаватель, оценка) ведутся два ряда по полю «Время
+создания»: по неделям и по семестрам. Ряд — это номер первой корзины и два
+плотных массива (сумма оценок и их число), поэтому новый ответ добавляется
+за O(1), а ряд из сотни недель занимает около килобайта.
+"""
+
+from array import array
+from datetime import date, timedelta
+
+from shards import semester_of, semester_sort_key, UNDATED
+
+GRANULARITIES = ('week', 'semester')
+
+# Недели считаются от понедельника, поэтому корзина — календарная неделя
+_EPOCH = date(2000, 1, 3)
+
+
+def time_buckets(created):
+    """'2025-07-11 20:22:49' -> (номер недели, номер семестра) или None без даты"""
+    try:
+        day = date(int(created[:4]), int(created[5:7]), int(created[8:10]))
+    except (TypeError, ValueError):
+        return None
+    key = semester_of(created)
+    if key == UNDATED:
+        return None
+    year, season = semester_sort_key(key)
+    return (day - _EPOCH).days // 7, 2 * year + season - 1
+
+
+def bucket_label(granularity, bucket):
+    if granularity == 'week':
+        return (_EPOCH + timedelta(weeks=bucket)).strftime('%d.%m.%Y')
+    year, season = divmod(bucket, 2)
+    return f'{"Весна" if season == 0 else "Осень"} {year}'
+
+
+class TimeSeries:
+    """Суммы и количества оценок по подряд идущим корзинам, начиная со start"""
+
+    __slots__ = ('start', 'sums', 'counts')
+
+    def __init__(self):
+        self.start = None
+        self.sums = array('d')
+        self.counts = array('l')
+
+    def add(self, bucket, value, count=1):
+        if self.start is None:
+            self.start = bucket
+        elif bucket < self.start:
+            pad = self.start - bucket
+            self.sums = array('d', [0.0]) * pad + self.sums
+            self.counts = array('l', [0]) * pad + self.counts
+            self.start = bucket
+        i = bucket - self.start
+        if i >= len(self.sums):
+            grow = i - len(self.sums) + 1
+            self.sums.extend([0.0] * grow)
+            self.counts.extend([0] * grow)
+        self.sums[i] += value
+        self.counts[i] += count
+
+    def merge(self, start, sums, counts):
+        for i, (total, count) in enumerate(zip(sums, counts)):
+            if count:
+                self.add(start + i, total, count)
+
+
+class TrendIndex:
+    """Ряды по (детализация, вид преподавателя, ключ, оценка)"""
+
+    def __init__(self):
+        self.series = {}
+
+    def clear(self):
+        self.series.clear()
+
+    def add(self, kind, name, score_key, buckets, value):
+        """Добавляет оценку; buckets — результат time_buckets() для ответа"""
+        for granularity, bucket in zip(GRANULARITIES, buckets):
+            key = (granularity, kind, name, score_key)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = TimeSeries()
+            series.add(bucket, value)
+
+    def points(self, kind, name, score_key, granularity, digits=2):
+        """Точки ряда от первой до последней корзины; в пустых mean = None"""
+        series = self.series.get((granularity, kind, name, score_key))
+        if series is None:
+            return []
+        return [
+            {
+                'label': bucket_label(granularity, series.start + i),
+                'mean': round(total / count, digits) if count else None,
+                'count': count,
+            }
+            for i, (total, count) in enumerate(zip(series.sums, series.counts))
+        ]
+
+    def export(self, label=str):
+        """Ряды строками [детализация, kind, имя, score_key, start, суммы, количества] для JSON"""
+        return [
+            [granularity, kind, label(name), score_key, series.start, list(series.sums), list(series.counts)]
+            for (granularity, kind, name, score_key), series in self.series.items()
+        ]
+
+    def merge_exported(self, rows, key=str):
+        """Обратная операция к export(); key превращает имя обратно в ключ"""
+        for granularity, kind, name, score_key, start, sums, counts in rows:
+            series_key = (granularity, kind, key(name), score_key)
+            series = self.series.get(series_key)
+            if series is None:
+                series = self.series[series_key] = TimeSeries()
+            series.merge(start, sums, counts)
@@ -8,6 +8,7 @@ from flask import Flask, request, jsonify
 import requests
 import json
 import os
+import threading
 from datetime import datetime
 
 app = Flask(__name__)
@@ -15,11 +16,20 @@ app = Flask(__name__)
 # Настройки GitHub
 GITHUB_TOKEN = os.environ.get("GITHUB_TOKEN", "YOUR_GITHUB_TOKEN")
 GITHUB_REPO = os.environ.get("GITHUB_REPO", "username/repo-name")  # Замените на ваш репозиторий
-GITHUB_API_URL = f"https://api.github.com/repos/{GITHUB_REPO}"
+# Базовые адреса API можно переопределить, например на локальные заглушки (webhook_loadtest.py)
+GITHUB_API_BASE = os.environ.get("GITHUB_API_BASE", "https://api.github.com")
+GITHUB_API_URL = f"{GITHUB_API_BASE}/repos/{GITHUB_REPO}"
 
 # Настройки Яндекс.Формы
 YANDEX_FORM_ID = "68713abe90fa7b9f66ab5c53"  # ID вашей формы
 YANDEX_API_TOKEN = os.environ.get("YANDEX_API_TOKEN", "YOUR_YANDEX_TOKEN")
+YANDEX_API_BASE = os.environ.get("YANDEX_API_BASE", "https://api.forms.yandex.ru")
+
+# Режим публикации: "actions" — PUT файла данных и запуск GitHub Action,
+# "commit" — локальная сборка и один коммит с данными и docs/ (github_publish.py)
+PUBLISH_MODE = os.environ.get("PUBLISH_MODE", "actions")
+# Сборка пишет в общие data/ и docs/, поэтому публикации идут по одной
+PUBLISH_LOCK = threading.Lock()
 
 @app.route('/webhook/yandex-form', methods=['POST'])
 def handle_yandex_webhook():
@@ -89,6 +99,9 @@ def update_site_data():
         if not form_data:
             return False
         
+        if PUBLISH_MODE == "commit":
+            return publish_site_commit(form_data)
+        
         # Обновляем файл данных в GitHub
         success = update_github_data_file(form_data)
         if not success:
@@ -110,7 +123,7 @@ def download_yandex_form_data():
     
     try:
         # URL для получения ответов формы
-        url = f"https://api.forms.yandex.ru/v1/forms/{YANDEX_FORM_ID}/responses"
+        url = f"{YANDEX_API_BASE}/v1/forms/{YANDEX_FORM_ID}/responses"
         headers = {
             'Authorization': f'Bearer {YANDEX_API_TOKEN}',
             'Content-Type': 'application/json'
@@ -212,6 +225,31 @@ def update_github_data_file(data):
         print(f"❌ Ошибка обновления GitHub: {e}")
         return False
 
+def publish_site_commit(data):
+    """Собирает сайт локально и публикует данные вместе с изменившимися файлами docs/ одним коммитом"""
+    if GITHUB_TOKEN == "YOUR_GITHUB_TOKEN":
+        print("⚠️ GitHub токен не настроен")
+        return False
+    
+    import github_publish
+    
+    try:
+        content = json.dumps(data, ensure_ascii=False, indent=2).encode('utf-8')
+        client = github_publish.GitDataClient(GITHUB_API_BASE, GITHUB_REPO, GITHUB_TOKEN)
+        with PUBLISH_LOCK:
+            stats = github_publish.publish_site(content, build=True, client=client)
+        
+        if stats['commit']:
+            print(f"✅ Опубликован коммит {stats['commit'][:12]}: изменено файлов {stats['changed']}, "
+                  f"удалено {stats['deleted']}")
+        else:
+            print("✅ Данные и сайт не изменились")
+        return True
+        
+    except (github_publish.PublishError, requests.RequestException) as e:
+        print(f"❌ Ошибка публикации: {e}")
+        return False
+
 def trigger_github_action():
     """Запускает GitHub Action для обновления сайта"""
     headers = {
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный прогон webhook_handler.py с локальными заглушками Яндекс.Форм и GitHub
+
+Отправляет JSON-RPC события form.response.created/updated с заданной
+частотой (записанные из файла или синтетические) и печатает пропускную
+способность, p50/p99 задержки и число обращений к внешним API на событие.
+Заглушки отвечают с настраиваемой задержкой и долей ошибок:
+
+    python webhook_loadtest.py --rate 20 --duration 10
+    python webhook_loadtest.py --rate 50 --burst 10 --github-fail-rate 0.1
+    python webhook_loadtest.py --payloads recorded.jsonl --yandex-latency-ms 300
+    python webhook_loadtest.py --publish-mode commit --rate 2 --duration 10
+
+По умолчанию обработчик запускается в этом же процессе. Чтобы гонять
+отдельно запущенный (например, под gunicorn), укажите --target и передайте
+ему адреса заглушек через YANDEX_API_BASE и GITHUB_API_BASE.
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import Flask, abort, jsonify, request
+from werkzeug.serving import make_server
+
+import benchmark
+from main import ID_Q
+
+YANDEX_PORT = 18081
+GITHUB_PORT = 18082
+HANDLER_PORT = 18080
+HANDLER_PATH = '/webhook/yandex-form'
+FORM_ID = '68713abe90fa7b9f66ab5c53'
+CREATED_Q = benchmark.CREATED_Q
+
+
+class UpstreamStub:
+    """Локальный HTTP-сервер вместо внешнего API: задержка, ошибки, счётчик вызовов
+
+    Маршруты регистрируют подклассы в self.app в своём __init__.
+    """
+
+    def __init__(self, name, port, latency_ms=0.0, fail_rate=0.0, seed=0):
+        self.name = name
+        self.port = port
+        self.latency = latency_ms / 1000
+        self.fail_rate = fail_rate
+        self.calls = Counter()          # маршрут -> число вызовов
+        self.failures = Counter()       # маршрут -> число подставленных ошибок
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+        self.app = Flask(name)
+        self.app.before_request(self._before_request)
+
+    @property
+    def base_url(self):
+        return f'http://127.0.0.1:{self.port}'
+
+    def _before_request(self):
+        route = f'{request.method} {request.url_rule.rule if request.url_rule else request.path}'
+        with self._lock:
+            self.calls[route] += 1
+            failed = self._rng.random() < self.fail_rate
+            if failed:
+                self.failures[route] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if failed:
+            return jsonify({'message': 'Injected upstream failure'}), 503
+
+    def start(self):
+        self._server = make_server('127.0.0.1', self.port, self.app, threaded=True)
+        self._thread = threading.Thread(target=self._server.serve_forever, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._thread.join()
+
+
+class YandexFormsStub(UpstreamStub):
+    """GET /v1/forms/<id>/responses — ответы формы в формате API Яндекс.Форм"""
+
+    def __init__(self, port, responses=100, **kwargs):
+        super().__init__('yandex-forms-stub', port, **kwargs)
+        self.body = json.dumps({'responses': [_to_yandex(entry) for entry in benchmark.generate_dataset(responses)]},
+                               ensure_ascii=False)
+        self._add_routes(self.app)
+
+    def _add_routes(self, app):
+        @app.route('/v1/forms/<form_id>/responses')
+        def responses(form_id):
+            return app.response_class(self.body, mimetype='application/json')
+
+
+def _object_sha(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class GitHubStub(UpstreamStub):
+    """Contents API, repository_dispatch и Git Data API (blobs, trees, commits, refs)
+
+    PUT с устаревшим sha получает 409, а обновление ref не fast-forward — 422,
+    как в GitHub. Деревья хранятся плоско: путь -> sha blob'а.
+    """
+
+    def __init__(self, port, **kwargs):
+        super().__init__('github-stub', port, **kwargs)
+        self.files = {}                 # путь -> sha содержимого
+        self.conflicts = 0
+        self.blobs = {}                 # sha -> байты
+        self.trees = {}                 # sha -> {путь: sha blob'а}
+        self.commits = {}               # sha -> {'tree', 'parents', 'message'}
+        self.refs = {}                  # ветка -> sha коммита
+
+        empty_tree = _object_sha({})
+        self.trees[empty_tree] = {}
+        root = _object_sha({'tree': empty_tree, 'parents': [], 'message': 'Initial commit'})
+        self.commits[root] = {'tree': empty_tree, 'parents': [], 'message': 'Initial commit'}
+        self.refs['main'] = root
+        self._add_routes(self.app)
+
+    def _add_routes(self, app):
+        @app.route('/repos/<owner>/<repo>/contents/<path:path>', methods=['GET'])
+        def get_contents(owner, repo, path):
+            with self._lock:
+                sha = self.files.get(path)
+            if sha is None:
+                abort(404)
+            return jsonify({'path': path, 'sha': sha})
+
+        @app.route('/repos/<owner>/<repo>/contents/<path:path>', methods=['PUT'])
+        def put_contents(owner, repo, path):
+            data = request.get_json()
+            content = base64.b64decode(data['content'])
+            with self._lock:
+                current = self.files.get(path)
+                if current is not None and data.get('sha') != current:
+                    self.conflicts += 1
+                    return jsonify({'message': f'{path} does not match {data.get("sha")}'}), 409
+                sha = self.files[path] = hashlib.sha1(content).hexdigest()
+            return jsonify({'content': {'path': path, 'sha': sha}}), 200 if current else 201
+
+        @app.route('/repos/<owner>/<repo>/dispatches', methods=['POST'])
+        def dispatches(owner, repo):
+            return '', 204
+
+        @app.route('/repos/<owner>/<repo>/git/ref/heads/<path:branch>', methods=['GET'])
+        def get_ref(owner, repo, branch):
+            with self._lock:
+                sha = self.refs.get(branch)
+            if sha is None:
+                abort(404)
+            return jsonify({'ref': f'refs/heads/{branch}', 'object': {'type': 'commit', 'sha': sha}})
+
+        @app.route('/repos/<owner>/<repo>/git/commits/<sha>', methods=['GET'])
+        def get_commit(owner, repo, sha):
+            commit = self.commits.get(sha)
+            if commit is None:
+                abort(404)
+            return jsonify({'sha': sha, 'tree': {'sha': commit['tree']},
+                            'parents': [{'sha': parent} for parent in commit['parents']],
+                            'message': commit['message']})
+
+        @app.route('/repos/<owner>/<repo>/git/trees/<sha>', methods=['GET'])
+        def get_tree(owner, repo, sha):
+            tree = self.trees.get(sha)
+            if tree is None:
+                abort(404)
+            entries = [{'path': path, 'mode': '100644', 'type': 'blob', 'sha': blob}
+                       for path, blob in sorted(tree.items())]
+            return jsonify({'sha': sha, 'tree': entries, 'truncated': False})
+
+        @app.route('/repos/<owner>/<repo>/git/blobs', methods=['POST'])
+        def create_blob(owner, repo):
+            content = base64.b64decode(request.get_json()['content'])
+            sha = hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+            with self._lock:
+                self.blobs[sha] = content
+            return jsonify({'sha': sha}), 201
+
+        @app.route('/repos/<owner>/<repo>/git/trees', methods=['POST'])
+        def create_tree(owner, repo):
+            data = request.get_json()
+            tree = dict(self.trees.get(data.get('base_tree'), {}))
+            for entry in data['tree']:
+                if entry['sha'] is None:
+                    tree.pop(entry['path'], None)
+                elif entry['sha'] not in self.blobs:
+                    return jsonify({'message': f'Blob {entry["sha"]} not found'}), 422
+                else:
+                    tree[entry['path']] = entry['sha']
+            sha = _object_sha(tree)
+            with self._lock:
+                self.trees[sha] = tree
+            return jsonify({'sha': sha}), 201
+
+        @app.route('/repos/<owner>/<repo>/git/commits', methods=['POST'])
+        def create_commit(owner, repo):
+            data = request.get_json()
+            commit = {'tree': data['tree'], 'parents': data['parents'], 'message': data['message']}
+            sha = _object_sha(commit)
+            with self._lock:
+                self.commits[sha] = commit
+            return jsonify({'sha': sha}), 201
+
+        @app.route('/repos/<owner>/<repo>/git/refs/heads/<path:branch>', methods=['PATCH'])
+        def update_ref(owner, repo, branch):
+            data = request.get_json()
+            with self._lock:
+                current = self.refs.get(branch)
+                commit = self.commits.get(data['sha'])
+                if commit is None:
+                    return jsonify({'message': 'Object does not exist'}), 422
+                if current is not None and not data.get('force') and current not in commit['parents']:
+                    self.conflicts += 1
+                    return jsonify({'message': 'Update is not a fast forward'}), 422
+                self.refs[branch] = data['sha']
+            return jsonify({'ref': f'refs/heads/{branch}', 'object': {'type': 'commit', 'sha': data['sha']}})
+
+
+def _to_yandex(entry):
+    """Сырой ответ [[вопрос, ответ], ...] -> ответ API Яндекс.Форм"""
+    answers = dict(entry)
+    return {
+        'id': answers.get(ID_Q, ''),
+        'created_at': answers.get(CREATED_Q, ''),
+        'answers': [
+            {'question': {'text': question}, 'value': value}
+            for question, value in entry
+            if question not in (ID_Q, CREATED_Q)
+        ],
+    }
+
+
+def synthetic_payloads(count, updated_share=0.2, seed=0):
+    """JSON-RPC события, как их присылает Яндекс.Форма"""
+    rng = random.Random(seed)
+    for i in range(count):
+        method = 'form.response.updated' if rng.random() < updated_share else 'form.response.created'
+        yield {
+            'jsonrpc': '2.0',
+            'method': method,
+            'params': {'form_id': FORM_ID, 'response_id': str(2200000000 + i)},
+            'id': i,
+        }
+
+
+def load_payloads(path):
+    """Записанные события: JSON-массив или JSONL по одному событию в строке"""
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def percentile(sorted_values, q):
+    """Перцентиль методом ближайшего ранга"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+@contextlib.contextmanager
+def local_handler(yandex, github, port, quiet=True, publish_mode='actions'):
+    """Поднимает webhook_handler.app в этом процессе, направив его на заглушки
+
+    Настоящие токены из окружения подменяются фиктивными, чтобы не уйти даже в заглушки.
+    Режим публикации задаётся явно, а не наследуется из PUBLISH_MODE. В режиме
+    "commit" файл с данными, шарды и собранный сайт пишутся во временную папку,
+    а не в data/ и docs/ репозитория.
+    """
+    os.environ.update({
+        'YANDEX_API_BASE': yandex.base_url,
+        'GITHUB_API_BASE': github.base_url,
+        'YANDEX_API_TOKEN': 'loadtest-token',
+        'GITHUB_TOKEN': 'loadtest-token',
+        'GITHUB_REPO': 'loadtest/feedback',
+        'PUBLISH_MODE': publish_mode,
+    })
+    import generate_static
+    import github_publish
+    import main
+    import webhook_handler
+    # Модули могли быть импортированы раньше — значения из окружения уже прочитаны
+    webhook_handler.PUBLISH_MODE = publish_mode
+    paths = (main.DATA_PATH, main.SHARDS_DIR, github_publish.SITE_DIR, generate_static.NGINX_CONFIG_PATH)
+
+    server = make_server('127.0.0.1', port, webhook_handler.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name='webhook-handler', daemon=True)
+    # Обработчик печатает каждое событие целиком — под нагрузкой это только шум
+    with tempfile.TemporaryDirectory(prefix='webhook-loadtest-') as workdir, \
+            open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull if quiet else sys.stdout):
+        main.DATA_PATH = os.path.join(workdir, 'data', 'responses.json')
+        main.SHARDS_DIR = os.path.join(workdir, 'data', 'shards')
+        github_publish.SITE_DIR = os.path.join(workdir, 'docs')
+        generate_static.NGINX_CONFIG_PATH = os.path.join(workdir, 'nginx', 'cache-headers.conf')
+        thread.start()
+        try:
+            yield f'http://127.0.0.1:{port}{HANDLER_PATH}'
+        finally:
+            server.shutdown()
+            thread.join()
+            main.DATA_PATH, main.SHARDS_DIR, github_publish.SITE_DIR, generate_static.NGINX_CONFIG_PATH = paths
+
+
+def replay(target, payloads, rate, burst=1, concurrency=32, timeout=30.0):
+    """Отправляет события по расписанию: пачки по burst событий с частотой rate событий/с
+
+    Задержка считается от запланированного момента отправки, поэтому ожидание
+    в очереди при перегрузке тоже попадает в p99.
+    """
+    local = threading.local()
+    results = []
+    results_lock = threading.Lock()
+
+    def send(payload, scheduled):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        try:
+            status = session.post(target, json=payload, timeout=timeout).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        finished = time.perf_counter()
+        with results_lock:
+            results.append((finished - scheduled, status, finished))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, payload in enumerate(payloads):
+            scheduled = start + (i // burst) * burst / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, payload, scheduled)
+    return start, results
+
+
+def report(start, results, stubs):
+    latencies = sorted(latency for latency, _, _ in results)
+    statuses = Counter(str(status) for _, status, _ in results)
+    events = len(results)
+    wall = (max(finished for _, _, finished in results) - start) if results else 0.0
+
+    upstream = {}
+    for stub in stubs:
+        for route, count in sorted(stub.calls.items()):
+            upstream[f'{stub.name} {route}'] = {
+                'calls': count,
+                'per_event': count / events if events else 0.0,
+                'injected_failures': stub.failures[route],
+            }
+
+    return {
+        'events': events,
+        'wall_seconds': wall,
+        'throughput': events / wall if wall else 0.0,
+        'statuses': dict(statuses),
+        'latency_ms': {
+            'p50': percentile(latencies, 50) * 1000 if latencies else None,
+            'p99': percentile(latencies, 99) * 1000 if latencies else None,
+            'max': latencies[-1] * 1000 if latencies else None,
+        },
+        'upstream': upstream,
+        'upstream_calls_per_event': sum(stub_calls['calls'] for stub_calls in upstream.values()) / events if events else 0.0,
+    }
+
+
+def print_report(result, github):
+    print(f'📨 Событий: {result["events"]} за {result["wall_seconds"]:.2f} с '
+          f'— {result["throughput"]:.1f} событий/с')
+    print('   Статусы: ' + ', '.join(f'{status}: {count}' for status, count in sorted(result['statuses'].items())))
+    latency = result['latency_ms']
+    if latency['p50'] is not None:
+        print(f'   Задержка: p50 {latency["p50"]:.1f} мс, p99 {latency["p99"]:.1f} мс, max {latency["max"]:.1f} мс')
+    print(f'🌐 Обращений к внешним API на событие: {result["upstream_calls_per_event"]:.2f}')
+    for route, stats in result['upstream'].items():
+        print(f'   {route:<60} {stats["calls"]:6d}  ({stats["per_event"]:.2f} на событие, '
+              f'ошибок подставлено: {stats["injected_failures"]})')
+    if github is not None and github.conflicts:
+        print(f'⚠️  Конфликтов sha при записи в GitHub: {github.conflicts}')
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rate', type=float, default=10.0, help='событий в секунду')
+    parser.add_argument('--duration', type=float, default=10.0, help='длительность синтетического прогона, с')
+    parser.add_argument('--events', type=int, help='число синтетических событий (вместо --duration)')
+    parser.add_argument('--burst', type=int, default=1, help='отправлять события пачками по N одновременно')
+    parser.add_argument('--concurrency', type=int, default=32, help='максимум одновременных запросов')
+    parser.add_argument('--timeout', type=float, default=30.0, help='таймаут одного запроса, с')
+    parser.add_argument('--payloads', help='JSON/JSONL с записанными событиями')
+    parser.add_argument('--updated-share', type=float, default=0.2,
+                        help='доля form.response.updated среди синтетических событий')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--form-responses', type=int, default=100,
+                        help='сколько ответов отдаёт заглушка Яндекс.Форм')
+    parser.add_argument('--yandex-latency-ms', type=float, default=50.0)
+    parser.add_argument('--yandex-fail-rate', type=float, default=0.0)
+    parser.add_argument('--github-latency-ms', type=float, default=100.0)
+    parser.add_argument('--github-fail-rate', type=float, default=0.0)
+    parser.add_argument('--target', help='URL уже запущенного обработчика вместо локального')
+    parser.add_argument('--publish-mode', choices=('actions', 'commit'), default='actions',
+                        help='режим публикации локального обработчика (commit собирает сайт во временной папке)')
+    parser.add_argument('--verbose', action='store_true', help='не глушить вывод локального обработчика')
+    parser.add_argument('--output', help='путь к JSON с результатами')
+    args = parser.parse_args(argv)
+
+    # Журнал каждого запроса от werkzeug под нагрузкой не нужен
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    if args.payloads:
+        payloads = load_payloads(args.payloads)
+    else:
+        count = args.events if args.events is not None else int(args.rate * args.duration)
+        payloads = list(synthetic_payloads(count, args.updated_share, args.seed))
+
+    yandex = YandexFormsStub(YANDEX_PORT, responses=args.form_responses, latency_ms=args.yandex_latency_ms,
+                             fail_rate=args.yandex_fail_rate, seed=args.seed)
+    github = GitHubStub(GITHUB_PORT, latency_ms=args.github_latency_ms,
+                        fail_rate=args.github_fail_rate, seed=args.seed + 1)
+    yandex.start()
+    github.start()
+    try:
+        if args.target:
+            print(f'Заглушки: YANDEX_API_BASE={yandex.base_url} GITHUB_API_BASE={github.base_url}')
+            handler = contextlib.nullcontext(args.target)
+        else:
+            handler = local_handler(yandex, github, HANDLER_PORT, quiet=not args.verbose,
+                                    publish_mode=args.publish_mode)
+
+        print(f'🚀 {len(payloads)} событий, {args.rate:g}/с, пачки по {args.burst}')
+        with handler as target:
+            start, results = replay(target, payloads, args.rate, args.burst, args.concurrency, args.timeout)
+    finally:
+        yandex.stop()
+        github.stop()
+
+    result = report(start, results, [yandex, github])
+    print_report(result, github)
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f'📝 Результаты сохранены: {args.output}')
+
+
+if __name__ == '__main__':
+    main_cli(sys.argv[1:])